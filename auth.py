@@ -1,24 +1,121 @@
 import os
-import pickle
-from google.auth.transport.requests import Request
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
 from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
 from config import SCOPES, CREDENTIALS_FILE, TOKEN_FILE, PROJECT_NAME
 
+# Re-check cached credentials this long before they expire
+TOKEN_EXPIRY_MARGIN = timedelta(seconds=60)
+
+
+class _AuthCache:
+    """Per-process credentials, so repeated calls skip the token load."""
+    __slots__ = ('creds', 'valid_until', 'token_json')
+    
+    def __init__(self):
+        self.creds = None
+        self.valid_until = None  # naive UTC, like Credentials.expiry; None = no expiry
+        self.token_json = None  # last token contents read from / written to disk
+
+
+_CACHE = _AuthCache()
+
+# Built services, one per thread (httplib2 is not thread-safe); shared by every finder
+_SERVICES = threading.local()
+
+_PRINT_LOCK = threading.Lock()
+
+# Serializes token loads/refreshes; worker threads may all find the token expired at once
+_CREDS_LOCK = threading.Lock()
+
+
+def reset_services():
+    """Drop cached credentials and services (e.g. after the token changes)."""
+    global _SERVICES
+    _CACHE.creds = None
+    _CACHE.valid_until = None
+    _CACHE.token_json = None
+    _SERVICES = threading.local()
+
+
+def _load_token():
+    """Load stored credentials, migrating a legacy pickled token to JSON."""
+    with open(TOKEN_FILE, 'rb') as token:
+        data = token.read()
+    print("📄 Found existing token, loading...")
+    
+    if data[:1] == b'\x80':
+        # Old pickle token - load once, then rewrite as JSON
+        import pickle
+        creds = pickle.loads(data)
+        _save_token(creds)
+        return creds
+    
+    try:
+        _CACHE.token_json = data.decode('utf-8')
+        return Credentials.from_authorized_user_info(json.loads(data), SCOPES)
+    except (ValueError, KeyError) as e:
+        print(f"⚠️  Could not read token: {e}")
+        return None
+
+
+def _save_token(creds):
+    """Persist credentials as JSON, skipping the write if nothing changed."""
+    token_json = creds.to_json()
+    if token_json == _CACHE.token_json:
+        return
+    
+    # Write to a temp file and swap it in so a crash never leaves a torn token
+    tmp_file = f"{TOKEN_FILE}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as token:
+        token.write(token_json)
+    os.replace(tmp_file, TOKEN_FILE)
+    _CACHE.token_json = token_json
+
+
+def _cached_credentials():
+    """Return the cached credentials if they are not about to expire, else None."""
+    creds = _CACHE.creds
+    valid_until = _CACHE.valid_until
+    if creds is not None and (
+        # valid_until is naive UTC, like Credentials.expiry
+        valid_until is None or datetime.now(timezone.utc).replace(tzinfo=None) < valid_until
+    ):
+        return creds
+    return None
+
 
 def get_credentials():
     """Get valid user credentials from storage or run OAuth flow."""
+    creds = _cached_credentials()
+    if creds is not None:
+        return creds
+    
+    with _CREDS_LOCK:
+        # Another thread may have refreshed while this one waited
+        creds = _cached_credentials()
+        if creds is not None:
+            return creds
+        return _load_credentials()
+
+
+def _load_credentials():
+    """Load, refresh or (re)authorize credentials and update the cache."""
     creds = None
     
-    if os.path.exists(TOKEN_FILE):
-        print("📄 Found existing token, loading...")
-        with open(TOKEN_FILE, 'rb') as token:
-            creds = pickle.load(token)
+    try:
+        creds = _load_token()
+    except FileNotFoundError:
+        creds = None
     
     if not creds or not creds.valid:
         if creds and creds.expired and creds.refresh_token:
             print("🔄 Token expired, refreshing...")
+            # Only needed to refresh; importing it pulls in requests and urllib3
+            from google.auth.transport.requests import Request
+            
             try:
                 creds.refresh(Request())
             except Exception as e:
@@ -27,11 +124,17 @@ def get_credentials():
                 creds = None
         
         if not creds:  # Need new authorization
-            if not os.path.exists(CREDENTIALS_FILE):
+            from google_auth_oauthlib.flow import InstalledAppFlow
+            
+            try:
+                flow = InstalledAppFlow.from_client_secrets_file(
+                    CREDENTIALS_FILE, SCOPES
+                )
+            except FileNotFoundError:
                 raise FileNotFoundError(
                     f"❌ Credentials file not found at {CREDENTIALS_FILE}\n"
                     "Please download from Google Cloud Console."
-                )
+                ) from None
             
             print("🔐 Starting OAuth flow...")
             print("📢 A browser window will open. Please:")
@@ -42,10 +145,6 @@ def get_credentials():
             print("      ✓ Gmail access")
             print("   4. Click 'Allow'\n")
             
-            flow = InstalledAppFlow.from_client_secrets_file(
-                CREDENTIALS_FILE, SCOPES
-            )
-            
             # Force consent screen even if previously approved
             creds = flow.run_local_server(
                 port=0, 
@@ -56,23 +155,22 @@ def get_credentials():
             )
         
         print("💾 Saving credentials...")
-        with open(TOKEN_FILE, 'wb') as token:
-            pickle.dump(creds, token)
+        _save_token(creds)
         
         # Verify scopes were granted
         print("\n🔍 Verifying granted scopes...")
         if creds.scopes:
             print("✅ Token has these scopes:")
+            # Print and check required scopes in one pass
+            has_drive = has_gmail = False
             for scope in creds.scopes:
-                scope_name = scope.split('/')[-1]
+                scope_name = scope.rsplit('/', 1)[-1]
                 if scope_name == 'drive':
                     print(f"   ✓ {scope_name}")
                 else:
                     print(f"   ✓ mail")
-            
-            # Check for required scopes
-            has_drive = any('drive' in s for s in creds.scopes)
-            has_gmail = any('mail.google.com' in s for s in creds.scopes)
+                has_drive = has_drive or 'drive' in scope
+                has_gmail = has_gmail or 'mail.google.com' in scope
             
             if not has_drive:
                 print("\n⚠️  WARNING: Drive scope missing!")
@@ -81,71 +179,104 @@ def get_credentials():
         else:
             print("⚠️  Could not verify scopes in token")
     
+    _CACHE.creds = creds
+    _CACHE.valid_until = creds.expiry - TOKEN_EXPIRY_MARGIN if creds.expiry else None
     return creds
 
 
+def _get_service(name, version):
+    """Return the calling thread's service for an API, building it on first use."""
+    services = _SERVICES
+    service = getattr(services, name, None)
+    if service is None:
+        from googleapiclient.discovery import build
+        service = build(name, version, credentials=get_credentials(),
+                        cache_discovery=False, static_discovery=True)
+        setattr(services, name, service)
+    return service
+
+
 def get_drive_service():
-    """Build and return Google Drive service."""
-    creds = get_credentials()
-    return build('drive', 'v3', credentials=creds)
+    """Build (once per thread) and return Google Drive service."""
+    return _get_service('drive', 'v3')
 
 
 def get_gmail_service():
-    """Build and return Gmail service."""
-    creds = get_credentials()
-    return build('gmail', 'v1', credentials=creds)
+    """Build (once per thread) and return Gmail service."""
+    return _get_service('gmail', 'v1')
+
+
+def get_media_session():
+    """Build (once per thread) and return an authorized requests session for streamed media downloads."""
+    services = _SERVICES
+    session = getattr(services, 'media_session', None)
+    if session is None:
+        from google.auth.transport.requests import AuthorizedSession
+        session = AuthorizedSession(get_credentials())
+        services.media_session = session
+    return session
+
+
+def _emit(lines):
+    """Print a block of lines without interleaving with other threads."""
+    with _PRINT_LOCK:
+        print("\n".join(lines))
 
 
 def test_drive_connection():
     """Test Drive API connection."""
-    print("\n📁 Testing Drive API connection...")
+    lines = ["\n📁 Testing Drive API connection..."]
     try:
         service = get_drive_service()
         
         results = service.files().list(
             pageSize=5, 
-            fields="files(id, name, mimeType, size)"
+            fields="files(name,size)"
         ).execute()
         files = results.get('files', [])
         
-        print("✅ Drive API Connected!")
+        lines.append("✅ Drive API Connected!")
         if files:
-            print(f"   Found {len(files)} sample files:")
+            lines.append(f"   Found {len(files)} sample files:")
             for file in files:
-                size = int(file.get('size', 0)) if file.get('size') else 0
+                size = int(file.get('size') or 0)
                 size_mb = size / (1024 * 1024)
-                print(f"     • {file['name']} ({size_mb:.2f} MB)")
+                lines.append(f"     • {file['name']} ({size_mb:.2f} MB)")
         else:
-            print("   No files found (empty Drive)")
+            lines.append("   No files found (empty Drive)")
         return True
     except Exception as e:
-        print(f"❌ Drive API Error: {e}")
+        lines.append(f"❌ Drive API Error: {e}")
         return False
+    finally:
+        _emit(lines)
 
 
 def test_gmail_connection():
     """Test Gmail API connection."""
-    print("\n📧 Testing Gmail API connection...")
+    lines = ["\n📧 Testing Gmail API connection..."]
     try:
         service = get_gmail_service()
         
         profile = service.users().getProfile(userId='me').execute()
         
-        print("✅ Gmail API Connected!")
-        print(f"   Email: {profile['emailAddress']}")
-        print(f"   Total messages: {profile.get('messagesTotal', 0):,}")
-        print(f"   Threads: {profile.get('threadsTotal', 0):,}")
+        lines.append("✅ Gmail API Connected!")
+        lines.append(f"   Email: {profile['emailAddress']}")
+        lines.append(f"   Total messages: {profile.get('messagesTotal', 0):,}")
+        lines.append(f"   Threads: {profile.get('threadsTotal', 0):,}")
         
         # Get storage info
         storage_mb = profile.get('emailUsedQuota', 0)
         if storage_mb:
             storage_mb = int(storage_mb) / (1024 * 1024)
-            print(f"   Storage used: {storage_mb:.2f} MB")
+            lines.append(f"   Storage used: {storage_mb:.2f} MB")
         
         return True
     except Exception as e:
-        print(f"❌ Gmail API Error: {e}")
+        lines.append(f"❌ Gmail API Error: {e}")
         return False
+    finally:
+        _emit(lines)
 
 
 if __name__ == "__main__":
@@ -154,9 +285,15 @@ if __name__ == "__main__":
     print("=" * 60)
     
     try:
-        # Test both APIs
-        drive_ok = test_drive_connection()
-        gmail_ok = test_gmail_connection()
+        # Authorize once up front so the OAuth flow never runs in two threads
+        get_credentials()
+        
+        # Test both APIs concurrently (each is one blocking HTTPS call)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            drive_future = executor.submit(test_drive_connection)
+            gmail_future = executor.submit(test_gmail_connection)
+            drive_ok = drive_future.result()
+            gmail_ok = gmail_future.result()
         
         print("\n" + "=" * 60)
         
@@ -1,17 +1,144 @@
-import argparse
+import heapq
 import sys
-from tqdm import tqdm
-from drive_service import DriveCleanupService
-from drive_duplicates import DriveDuplicateFinder
-from drive_similar_images import SimilarImageFinder
-from gmail_service import GmailAttachmentScanner
-from config import PROJECT_NAME, VERSION, SIMILARITY_THRESHOLD, GMAIL_MIN_ATTACHMENT_SIZE_MB
+import time
+from itertools import islice
+from types import SimpleNamespace
+from typing import List, Optional
+from config import PROJECT_NAME, VERSION, SIMILARITY_THRESHOLD, GMAIL_MIN_ATTACHMENT_SIZE_MB, DUMP_WORKERS
+
+# Static output, built once at import
+PROGRESS_LINE = "\r{desc}: {done}/{total} | freed {freed:.1f} MB".format
+SEPARATOR = "=" * 70
+
+# Per-row templates for the top-N summaries
+DUPLICATE_LINE = "{i}. {name}\n   {n} copies × {mb:.1f} MB = {w:.1f} MB wasted\n".format
+SIMILAR_LINE = "{i}. {name} (KEEPER)\n   {n} similar images\n   Wasted: {w:.2f} MB\n".format
+EMAIL_LINE = "{i}. {subject}\n   {n} attachments = {mb:.1f} MB\n".format
+FILE_TYPE_LINE = "{i}. {mime_type}\n   {count} files = {mb:.1f} MB\n".format
+
+# Multi-line result blocks, each written with a single call
+DUPLICATE_RESULTS = """
+📊 RESULTS:
+   Duplicate files: {files:,}
+   Duplicate groups: {groups:,}
+   Wasted space: {gb:.2f} GB
+
+🔝 TOP 10 SPACE WASTERS:
+""".format
+SIMILAR_RESULTS = """
+📊 RESULTS:
+   Similar images: {files:,}
+   Similar groups: {groups:,}
+   Wasted space: {gb:.2f} GB
+
+🔝 TOP 5 SIMILAR IMAGE GROUPS:
+""".format
+GMAIL_RESULTS = """
+📊 RESULTS:
+   Emails with attachments: {emails:,}
+   Total attachments: {attachments:,}
+   Total size: {gb:.2f} GB
+
+📁 TOP 5 FILE TYPES:
+""".format
+DUPLICATES_DUMP_SUMMARY = f"""
+{SEPARATOR}
+✅ DUMP & DELETE COMPLETE
+{SEPARATOR}
+
+📊 RESULTS:
+   Groups processed: {{groups}}
+   Files deleted from Drive: {{deleted}}
+   Files kept in Drive: {{groups}}
+   Files skipped (no permission): {{no_permission}}
+   Files skipped (delete failed, run again): {{delete_failed}}
+   Space freed: {{mb:.2f}} MB ({{gb:.2f}} GB)
+{SEPARATOR}
+""".format
+SIMILAR_DUMP_SUMMARY = """
+✅ COMPLETE
+Space freed: {mb:.2f} MB
+""".format
+GMAIL_DUMP_SUMMARY = f"""
+{SEPARATOR}
+✅ COMPLETE
+{SEPARATOR}
+
+📊 RESULTS:
+   Emails moved to trash: {{deleted}}
+   Space freed: {{mb:.2f}} MB ({{gb:.2f}} GB)
+   📂 Attachments backed up: gmail_attachments_dump/
+{SEPARATOR}
+""".format
+
+DUPLICATES_DUMP_BANNER = f"""
+{SEPARATOR}
+⚠️  DUMP & DELETE MODE
+{SEPARATOR}
+
+🚨 WARNING: This will:
+   1. Download duplicate files to local 'duplicates_dump' folder
+   2. DELETE duplicate files from Google Drive (keeps oldest copy)
+   3. Skip shared files (no permission to delete)
+   4. Free up space immediately
+
+"""
+
+SIMILAR_DUMP_BANNER = f"""
+{SEPARATOR}
+⚠️  DUMP & DELETE MODE - SIMILAR IMAGES
+{SEPARATOR}
+"""
+
+GMAIL_DUMP_BANNER = f"""
+{SEPARATOR}
+⚠️  DUMP & DELETE MODE - GMAIL
+{SEPARATOR}
+
+🚨 WARNING: This will:
+   1. Download attachments to local 'gmail_attachments_dump' folder
+   2. MOVE emails to TRASH (not permanent delete)
+   3. Free up Gmail storage immediately
+
+"""
+
+
+class ProgressPrinter:
+    """Single-line progress on stderr, redrawn at most every `interval` seconds."""
+    
+    def __init__(self, total: int, desc: str, interval: float = 0.25):
+        self.total = total
+        self.desc = desc
+        self.interval = interval
+        self.done = 0
+        self.freed_mb = 0.0
+        self._last_print = 0.0
+    
+    def update(self, freed_mb: float):
+        """Record one finished item and the running total of space freed."""
+        self.done += 1
+        self.freed_mb = freed_mb
+        now = time.monotonic()
+        if now - self._last_print >= self.interval:
+            self._last_print = now
+            self._draw()
+    
+    def close(self):
+        """Draw the final state and end the line."""
+        self._draw()
+        sys.stderr.write("\n")
+    
+    def _draw(self):
+        sys.stderr.write(PROGRESS_LINE(desc=self.desc, done=self.done, total=self.total, freed=self.freed_mb))
+        sys.stderr.flush()
 
 
 def scan_drive(min_size_mb: int):
     """Scan Google Drive for large files."""
     print(f"\n🔍 Scanning Drive for files > {min_size_mb}MB...\n")
     
+    from drive_service import DriveCleanupService
+    
     service = DriveCleanupService()
     files = service.list_large_media_files(min_size_mb * 1024 * 1024)
     space_mb = service.calculate_space(files)
@@ -20,19 +147,24 @@ def scan_drive(min_size_mb: int):
     print(f"💾 Total space: {space_mb:.2f} MB ({space_mb/1024:.2f} GB)")
 
 
-def find_duplicates(dump: bool = False):
+def find_duplicates(dump: bool = False, workers: int = DUMP_WORKERS, use_cache: bool = True,
+                    assume_yes: bool = False):
     """Find duplicate files in Drive."""
     print("\n🔍 Scanning Drive for duplicate files...\n")
     
-    finder = DriveDuplicateFinder()
+    from drive_duplicates import DriveDuplicateFinder
+    from file_index import FileIndex
     
-    files = finder.list_all_files()
+    with FileIndex() as file_index:
+        finder = DriveDuplicateFinder(file_index=file_index)
+        
+        files = finder.list_all_files(full_scan=not use_cache)
     
     if not files:
         print("❌ No files found in Drive")
         return
     
-    duplicates = finder.find_duplicates(files)
+    duplicates = finder.find_duplicates(files, use_cache=use_cache)
     
     if not duplicates:
         print("\n✅ No duplicates found! Your Drive is clean.")
@@ -40,92 +172,81 @@ def find_duplicates(dump: bool = False):
     
     stats = finder.calculate_wasted_space(duplicates)
     
-    print(f"\n📊 RESULTS:")
-    print(f"   Duplicate files: {stats['total_duplicate_files']:,}")
-    print(f"   Duplicate groups: {stats['total_duplicate_groups']:,}")
-    print(f"   Wasted space: {stats['total_wasted_gb']:.2f} GB\n")
-    
-    print("🔝 TOP 10 SPACE WASTERS:")
-    for i, group in enumerate(stats['duplicate_groups'][:10], 1):
-        print(f"{i}. {group['filename']}")
-        print(f"   {group['num_copies']} copies × {group['file_size_mb']:.1f} MB = {group['wasted_mb']:.1f} MB wasted")
+    sys.stdout.write(DUPLICATE_RESULTS(files=stats['total_duplicate_files'], groups=stats['total_duplicate_groups'],
+                                       gb=stats['total_wasted_gb']))
+    sys.stdout.writelines(
+        DUPLICATE_LINE(i=i, name=g['filename'], n=g['num_copies'], mb=g['file_size_mb'], w=g['wasted_mb'])
+        for i, g in enumerate(islice(stats['duplicate_groups'], 10), 1)
+    )
     
-    report = finder.generate_report(stats)
     report_file = 'duplicate_report.txt'
-    with open(report_file, 'w', encoding='utf-8') as f:
-        f.write(report)
+    finder.save_report(stats, report_file)
     
     print(f"\n💾 Full report saved to: {report_file}")
     
     if dump:
-        print("\n" + "=" * 70)
-        print("⚠️  DUMP & DELETE MODE")
-        print("=" * 70)
-        print("\n🚨 WARNING: This will:")
-        print("   1. Download duplicate files to local 'duplicates_dump' folder")
-        print("   2. DELETE duplicate files from Google Drive (keeps oldest copy)")
-        print("   3. Skip shared files (no permission to delete)")
-        print("   4. Free up space immediately\n")
+        sys.stdout.write(DUPLICATES_DUMP_BANNER)
         
-        confirm = input("⚠️  Are you SURE you want to proceed? Type 'YES' to confirm: ")
-        
-        if confirm == 'YES':
+        if assume_yes or input("⚠️  Are you SURE you want to proceed? Type 'YES' to confirm: ") == 'YES':
             print("\n📥 Processing duplicates...\n")
             
             total_freed_mb = 0
             total_deleted = 0
-            total_skipped = 0
+            total_no_permission = 0
+            total_delete_failed = 0
             total_failed = 0
             
-            pbar = tqdm(stats['duplicate_groups'], 
-                       desc="Dumping & deleting", 
-                       ncols=80,
-                       bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}]')
+            progress = ProgressPrinter(len(stats['duplicate_groups']), "Dumping & deleting")
             
-            for group in pbar:
-                result = finder.dump_and_delete_duplicates(group, keep_index=0)
+            results = finder.batch_dump_and_delete_duplicates(stats['duplicate_groups'],
+                                                              keep_index=0, workers=workers)
+            for result in results:
                 total_freed_mb += result['space_freed_mb']
                 total_deleted += len(result['deleted_from_drive'])
-                total_skipped += len(result['skipped_no_permission'])
+                for skipped in result['skipped_no_permission']:
+                    if skipped['reason'] == 'no_permission':
+                        total_no_permission += 1
+                    else:
+                        total_delete_failed += 1
                 total_failed += len(result['failed'])
+                progress.update(total_freed_mb)
             
-            pbar.close()
+            progress.close()
             
-            print("\n" + "=" * 70)
-            print("✅ DUMP & DELETE COMPLETE")
-            print("=" * 70)
-            print(f"\n📊 RESULTS:")
-            print(f"   Groups processed: {len(stats['duplicate_groups'])}")
-            print(f"   Files deleted from Drive: {total_deleted}")
-            print(f"   Files kept in Drive: {len(stats['duplicate_groups'])}")
-            print(f"   Files skipped: {total_skipped}")
-            print(f"   Space freed: {total_freed_mb:.2f} MB ({total_freed_mb/1024:.2f} GB)")
-            print("=" * 70)
+            sys.stdout.write(DUPLICATES_DUMP_SUMMARY(groups=len(stats['duplicate_groups']), deleted=total_deleted,
+                                                     no_permission=total_no_permission,
+                                                     delete_failed=total_delete_failed, mb=total_freed_mb,
+                                                     gb=total_freed_mb / 1024))
         else:
             print("❌ Cancelled")
 
 
-def find_similar_images(threshold: float, dump: bool = False):
+def find_similar_images(threshold: float, dump: bool = False, workers: int = DUMP_WORKERS,
+                        use_cache: bool = True, assume_yes: bool = False):
     """Find visually similar images in Drive."""
     print(f"\n📸 Scanning Drive for similar images (threshold: {threshold*100:.0f}%)...\n")
     
-    finder = SimilarImageFinder(similarity_threshold=threshold)
-    
-    images = finder.list_all_images()
-    
-    if not images:
-        print("❌ No images found in Drive")
-        return
-    
-    print(f"🔍 Processing all {len(images)} images (this may take a while)...\n")
+    from drive_similar_images import SimilarImageFinder
+    from hash_cache import HashCache
     
-    hashes = finder.compute_hashes_for_images(images)
+    with HashCache() as hash_cache:
+        finder = SimilarImageFinder(similarity_threshold=threshold, hash_cache=hash_cache)
+        
+        images = finder.list_all_images()
+        
+        if not images:
+            print("❌ No images found in Drive")
+            return
+        
+        print(f"🔍 Processing all {len(images)} images (this may take a while)...\n")
+        
+        hashes = finder.compute_hashes_for_images(images)
     
     if not hashes:
         print("❌ Failed to compute hashes")
         return
     
-    similar_groups = finder.find_similar_images(images, hashes)
+    similar_groups = finder.find_similar_images(images, hashes, use_cache=use_cache)
     
     if not similar_groups:
         print("\n✅ No similar images found!")
@@ -133,63 +254,55 @@ def find_similar_images(threshold: float, dump: bool = False):
     
     stats = finder.calculate_wasted_space(similar_groups)
     
-    print(f"\n📊 RESULTS:")
-    print(f"   Similar images: {stats['total_similar_files']:,}")
-    print(f"   Similar groups: {stats['total_groups']:,}")
-    print(f"   Wasted space: {stats['total_wasted_gb']:.2f} GB\n")
-    
-    print("🔝 TOP 5 SIMILAR IMAGE GROUPS:")
-    for i, group in enumerate(stats['similar_groups'][:5], 1):
-        keeper = group['keeper']
-        print(f"{i}. {keeper['name']} (KEEPER)")
-        print(f"   {group['num_similar'] - 1} similar images")
-        print(f"   Wasted: {group['wasted_mb']:.2f} MB")
+    sys.stdout.write(SIMILAR_RESULTS(files=stats['total_similar_files'], groups=stats['total_groups'],
+                                     gb=stats['total_wasted_gb']))
+    sys.stdout.writelines(
+        SIMILAR_LINE(i=i, name=g['keeper']['name'], n=g['num_similar'] - 1, w=g['wasted_mb'])
+        for i, g in enumerate(islice(stats['similar_groups'], 5), 1)
+    )
     
-    report = finder.generate_report(stats)
     report_file = 'similar_images_report.txt'
-    with open(report_file, 'w', encoding='utf-8') as f:
-        f.write(report)
+    finder.save_report(stats, report_file)
     
     print(f"\n💾 Full report saved to: {report_file}")
     
     if dump:
-        print("\n" + "=" * 70)
-        print("⚠️  DUMP & DELETE MODE - SIMILAR IMAGES")
-        print("=" * 70)
-        
-        confirm = input("⚠️  Proceed? Type 'YES': ")
+        sys.stdout.write(SIMILAR_DUMP_BANNER)
         
-        if confirm == 'YES':
+        if assume_yes or input("⚠️  Proceed? Type 'YES': ") == 'YES':
             print("\n📥 Processing...\n")
             
             total_freed_mb = 0
             total_deleted = 0
             
-            pbar = tqdm(stats['similar_groups'], 
-                       desc="Dumping & deleting", 
-                       ncols=80,
-                       bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt}')
+            progress = ProgressPrinter(len(stats['similar_groups']), "Dumping & deleting")
             
-            for group in pbar:
-                result = finder.dump_and_delete_similar(group, keep_index=0)
+            results = finder.batch_dump_and_delete_similar(stats['similar_groups'],
+                                                           keep_index=0, workers=workers)
+            for result in results:
                 total_freed_mb += result['space_freed_mb']
                 total_deleted += len(result['deleted_from_drive'])
+                progress.update(total_freed_mb)
             
-            pbar.close()
+            progress.close()
             
-            print("\n✅ COMPLETE")
-            print(f"Space freed: {total_freed_mb:.2f} MB")
+            sys.stdout.write(SIMILAR_DUMP_SUMMARY(mb=total_freed_mb))
         else:
             print("❌ Cancelled")
 
 
-def scan_gmail_attachments(min_size_mb: int, max_emails: int, dump: bool = False):
+def scan_gmail_attachments(min_size_mb: int, max_emails: int, dump: bool = False,
+                           workers: int = DUMP_WORKERS, assume_yes: bool = False):
     """Scan Gmail for large attachments."""
     print(f"\n📧 Scanning Gmail for attachments > {min_size_mb}MB...\n")
     
-    scanner = GmailAttachmentScanner(min_size_mb=min_size_mb)
+    from gmail_service import GmailAttachmentScanner
+    from message_cache import MessageCache
     
-    emails = scanner.search_emails_with_large_attachments(max_results=max_emails)
+    with MessageCache() as message_cache:
+        scanner = GmailAttachmentScanner(min_size_mb=min_size_mb, message_cache=message_cache)
+        
+        emails = scanner.search_emails_with_large_attachments(max_results=max_emails)
     
     if not emails:
         print("✅ No large attachments found!")
@@ -197,73 +310,92 @@ def scan_gmail_attachments(min_size_mb: int, max_emails: int, dump: bool = False
     
     stats = scanner.calculate_stats(emails)
     
-    print(f"\n📊 RESULTS:")
-    print(f"   Emails with attachments: {stats['total_emails']:,}")
-    print(f"   Total attachments: {stats['total_attachments']:,}")
-    print(f"   Total size: {stats['total_size_gb']:.2f} GB\n")
-    
-    print("📁 TOP 5 FILE TYPES:")
-    for i, (mime_type, data) in enumerate(sorted(stats['by_type'].items(), 
-                                                  key=lambda x: x[1]['size_bytes'], 
-                                                  reverse=True)[:5], 1):
-        print(f"{i}. {mime_type}")
-        print(f"   {data['count']} files = {data['size_mb']:.1f} MB")
+    sys.stdout.write(GMAIL_RESULTS(emails=stats['total_emails'], attachments=stats['total_attachments'],
+                                   gb=stats['total_size_gb']))
+    top_types = heapq.nlargest(5, stats['by_type'].items(), key=lambda x: x[1]['size_bytes'])
+    sys.stdout.writelines(
+        FILE_TYPE_LINE(i=i, mime_type=mime_type, count=data['count'], mb=data['size_mb'])
+        for i, (mime_type, data) in enumerate(top_types, 1)
+    )
     
-    print("\n🔝 TOP 5 LARGEST EMAILS:")
-    for i, email in enumerate(stats['emails_sorted'][:5], 1):
-        print(f"{i}. {email['subject'][:50]}")
-        print(f"   {email['num_attachments']} attachments = {email['total_attachment_size_mb']:.1f} MB")
+    sys.stdout.write("\n🔝 TOP 5 LARGEST EMAILS:\n")
+    sys.stdout.writelines(
+        EMAIL_LINE(i=i, subject=e['subject'][:50], n=e['num_attachments'], mb=e['total_attachment_size_mb'])
+        for i, e in enumerate(islice(stats['top_emails'], 5), 1)
+    )
     
-    report = scanner.generate_report(stats)
     report_file = 'gmail_attachments_report.txt'
-    with open(report_file, 'w', encoding='utf-8') as f:
-        f.write(report)
+    scanner.save_report(stats, report_file)
     
     print(f"\n💾 Full report saved to: {report_file}")
     
     if dump:
-        print("\n" + "=" * 70)
-        print("⚠️  DUMP & DELETE MODE - GMAIL")
-        print("=" * 70)
-        print("\n🚨 WARNING: This will:")
-        print("   1. Download attachments to local 'gmail_attachments_dump' folder")
-        print("   2. MOVE emails to TRASH (not permanent delete)")
-        print("   3. Free up Gmail storage immediately\n")
+        sys.stdout.write(GMAIL_DUMP_BANNER)
         
-        confirm = input("⚠️  Are you SURE? Type 'YES': ")
-        
-        if confirm == 'YES':
+        if assume_yes or input("⚠️  Are you SURE? Type 'YES': ") == 'YES':
             print("\n📥 Processing emails...\n")
             
             total_freed_mb = 0
             total_deleted = 0
             
-            pbar = tqdm(stats['emails_sorted'], 
-                       desc="Dumping & deleting", 
-                       ncols=80,
-                       bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt}')
+            progress = ProgressPrinter(len(stats['emails']), "Dumping & deleting")
             
-            for email in pbar:
-                result = scanner.dump_and_delete_emails(email)
+            # Largest first, so an interrupted dump has freed the most space
+            emails_by_size = sorted(stats['emails'], key=lambda e: e['total_attachment_size_bytes'], reverse=True)
+            for result in scanner.batch_dump_and_delete_emails(emails_by_size, workers=workers):
                 total_freed_mb += result['space_freed_mb']
                 if result['deleted']:
                     total_deleted += 1
+                progress.update(total_freed_mb)
             
-            pbar.close()
+            progress.close()
             
-            print("\n" + "=" * 70)
-            print("✅ COMPLETE")
-            print("=" * 70)
-            print(f"\n📊 RESULTS:")
-            print(f"   Emails moved to trash: {total_deleted}")
-            print(f"   Space freed: {total_freed_mb:.2f} MB ({total_freed_mb/1024:.2f} GB)")
-            print(f"   📂 Attachments backed up: gmail_attachments_dump/")
-            print("=" * 70)
+            sys.stdout.write(GMAIL_DUMP_SUMMARY(deleted=total_deleted, mb=total_freed_mb, gb=total_freed_mb / 1024))
         else:
             print("❌ Cancelled")
 
 
-def main():
+def positive_int(value: str) -> int:
+    """Option type for counts that must be at least 1 (argparse and the fast path both reject the rest)."""
+    number = int(value)
+    if number < 1:
+        raise ValueError(f"{value} is less than 1")
+    return number
+
+
+# Subcommand options shared by the argparse parser and the fast path:
+# (flag or tuple of flags, dest, type, default, help) - a type of None is a store_true flag
+COMMANDS = {
+    'drive-scan': ('Scan Drive for large files', [
+        ('--min-size', 'min_size', int, 5, None),
+    ]),
+    'drive-duplicates': ('Find duplicate files', [
+        ('--dump', 'dump', None, False, None),
+        ('--workers', 'workers', positive_int, DUMP_WORKERS, 'Duplicate groups to dump & delete in parallel'),
+        ('--no-cache', 'no_cache', None, False, 'Rescan all of Drive and recompute instead of using saved results'),
+        (('--yes', '-y'), 'yes', None, False, 'Skip the YES confirmation prompt (for unattended runs)'),
+    ]),
+    'drive-similar': ('Find similar images', [
+        ('--threshold', 'threshold', float, SIMILARITY_THRESHOLD, None),
+        ('--dump', 'dump', None, False, '⚠️  Download + DELETE similar images (keeps best quality)'),
+        ('--workers', 'workers', positive_int, DUMP_WORKERS, 'Similar groups to dump & delete in parallel'),
+        ('--no-cache', 'no_cache', None, False, 'Recompute instead of reusing a recent cached result'),
+        (('--yes', '-y'), 'yes', None, False, 'Skip the YES confirmation prompt (for unattended runs)'),
+    ]),
+    'gmail-scan': ('Scan Gmail for large attachments', [
+        ('--min-size', 'min_size', int, GMAIL_MIN_ATTACHMENT_SIZE_MB, None),
+        ('--max-emails', 'max_emails', int, 500, None),
+        ('--dump', 'dump', None, False, None),
+        ('--workers', 'workers', positive_int, DUMP_WORKERS, 'Attachments to download in parallel while dumping'),
+        (('--yes', '-y'), 'yes', None, False, 'Skip the YES confirmation prompt (for unattended runs)'),
+    ]),
+}
+
+
+def build_parser():
+    """Build the full argparse parser (help, errors and unusual syntax)."""
+    import argparse
+    
     parser = argparse.ArgumentParser(
         description=f"{PROJECT_NAME} v{VERSION}",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -272,6 +404,7 @@ Examples:
   python cli.py drive-scan --min-size 10          # Find large files
   python cli.py drive-duplicates                  # Find exact duplicates (read-only)
   python cli.py drive-duplicates --dump           # Delete duplicates from Drive
+  python cli.py drive-duplicates --dump --yes     # Same, without the confirmation prompt
   python cli.py drive-similar --threshold 0.90    # Find similar images (read-only)
   python cli.py drive-similar --threshold 0.90 --dump  # Delete similar images
   python cli.py gmail-scan --min-size 5          # Scan Gmail for large attachments
@@ -279,38 +412,86 @@ Examples:
         """
     )
     
+    parser.add_argument('--verbose', '-v', action='store_true', help='Show debug logging')
+    
     subparsers = parser.add_subparsers(dest='command', help='Command to run')
     
-    # Drive scan
-    drive_scan_parser = subparsers.add_parser('drive-scan', help='Scan Drive for large files')
-    drive_scan_parser.add_argument('--min-size', type=int, default=5)
-    
-    # Drive duplicates
-    drive_dup_parser = subparsers.add_parser('drive-duplicates', help='Find duplicate files')
-    drive_dup_parser.add_argument('--dump', action='store_true')
-    
-    # Drive similar images
-    drive_similar_parser = subparsers.add_parser('drive-similar', help='Find similar images')
-    drive_similar_parser.add_argument('--threshold', type=float, default=SIMILARITY_THRESHOLD)
-    drive_similar_parser.add_argument('--dump', action='store_true', 
-                                     help='⚠️  Download + DELETE similar images (keeps best quality)')
-    
-    # Gmail scan
-    gmail_scan_parser = subparsers.add_parser('gmail-scan', help='Scan Gmail for large attachments')
-    gmail_scan_parser.add_argument('--min-size', type=int, default=GMAIL_MIN_ATTACHMENT_SIZE_MB)
-    gmail_scan_parser.add_argument('--max-emails', type=int, default=500)
-    gmail_scan_parser.add_argument('--dump', action='store_true')
-    
-    args = parser.parse_args()
-    
-    if args.command == 'drive-scan':
-        scan_drive(args.min_size)
-    elif args.command == 'drive-duplicates':
-        find_duplicates(dump=args.dump)
-    elif args.command == 'drive-similar':
-        find_similar_images(args.threshold, dump=args.dump)
-    elif args.command == 'gmail-scan':
-        scan_gmail_attachments(args.min_size, args.max_emails, dump=args.dump)
+    for command, (command_help, options) in COMMANDS.items():
+        command_parser = subparsers.add_parser(command, help=command_help)
+        for flag, dest, type_, default, option_help in options:
+            flags = flag if isinstance(flag, tuple) else (flag,)
+            if type_ is None:
+                command_parser.add_argument(*flags, dest=dest, action='store_true', help=option_help)
+            else:
+                command_parser.add_argument(*flags, dest=dest, type=type_, default=default, help=option_help)
+    
+    return parser
+
+
+def fast_parse_args(argv: List[str]) -> Optional[SimpleNamespace]:
+    """
+    Parse plain `<command> [--flag [value]] ...` invocations without argparse.
+    
+    Args:
+        argv: Command-line arguments (without the program name)
+    
+    Returns:
+        Parsed arguments, or None if argparse should handle the invocation
+        (no command, --help, unknown or abbreviated flags, bad values)
+    """
+    if not argv or argv[0] not in COMMANDS:
+        return None
+    
+    options = {}
+    for option in COMMANDS[argv[0]][1]:
+        for flag in (option[0] if isinstance(option[0], tuple) else (option[0],)):
+            options[flag] = option
+    values = {dest: default for _, dest, _, default, _ in options.values()}
+    
+    tokens = iter(argv[1:])
+    for token in tokens:
+        option = options.get(token)
+        if option is None:
+            return None
+        _, dest, type_, _, _ = option
+        if type_ is None:
+            values[dest] = True
+            continue
+        try:
+            values[dest] = type_(next(tokens))
+        except (StopIteration, ValueError):
+            return None
+    
+    return SimpleNamespace(command=argv[0], verbose=False, **values)
+
+
+# Subcommand handlers; each imports only the service module it needs
+DISPATCH = {
+    'drive-scan': lambda a: scan_drive(a.min_size),
+    'drive-duplicates': lambda a: find_duplicates(dump=a.dump, workers=a.workers, use_cache=not a.no_cache,
+                                                  assume_yes=a.yes),
+    'drive-similar': lambda a: find_similar_images(a.threshold, dump=a.dump, workers=a.workers,
+                                                   use_cache=not a.no_cache, assume_yes=a.yes),
+    'gmail-scan': lambda a: scan_gmail_attachments(a.min_size, a.max_emails, dump=a.dump, workers=a.workers,
+                                                   assume_yes=a.yes),
+}
+
+
+def main():
+    args = fast_parse_args(sys.argv[1:])
+    if args is None:
+        parser = build_parser()
+        args = parser.parse_args()
+    
+    if args.verbose:
+        import logging
+        # force: replaces any handler installed before this point, so DEBUG really applies
+        logging.basicConfig(level=logging.DEBUG, force=True)
+        logging.getLogger(__name__).debug("%s v%s - config loaded", PROJECT_NAME, VERSION)
+    
+    handler = DISPATCH.get(args.command)
+    if handler:
+        handler(args)
     else:
         parser.print_help()
 
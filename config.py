@@ -21,18 +21,25 @@ SCOPES = [
 CREDENTIALS_FILE = BASE_DIR / 'credentials.json'
 TOKEN_FILE = BASE_DIR / 'token.json'
 
-# Directories
-KNOWN_FACES_DIR = BASE_DIR / 'known_faces'
-KNOWN_FACES_DIR.mkdir(exist_ok=True)
+# Persistent cache of computed file hashes
+HASH_CACHE_DB = BASE_DIR / '.hash_cache.db'
 
-DOWNLOADS_DIR = BASE_DIR / 'downloads'
-DOWNLOADS_DIR.mkdir(exist_ok=True)
+# Snapshot of the last Drive listing, updated incrementally via changes()
+FILE_INDEX_DB = BASE_DIR / '.file_index.db'
 
-TEMP_DIR = BASE_DIR / 'temp'
-TEMP_DIR.mkdir(exist_ok=True)
+# Parsed Gmail message details, so rescans only fetch new messages
+GMAIL_MESSAGE_CACHE_DB = BASE_DIR / '.gmail_message_cache.db'
 
-DUPLICATES_DUMP_DIR = BASE_DIR / 'duplicates_dump'  # NEW: For dumping duplicates
-DUPLICATES_DUMP_DIR.mkdir(exist_ok=True)
+# On-disk cache of duplicate / similar-image results
+RESULT_CACHE_DIR = BASE_DIR / '.result_cache'
+RESULT_CACHE_TTL = int(os.getenv('RESULT_CACHE_TTL', 3600))  # Seconds a cached result stays valid
+
+# Directories (created on first use, not at import)
+KNOWN_FACES_DIR = BASE_DIR / 'known_faces'
+DOWNLOADS_DIR = BASE_DIR / 'downloads'
+TEMP_DIR = BASE_DIR / 'temp'
+DUPLICATES_DUMP_DIR = BASE_DIR / 'duplicates_dump'  # Dumped duplicates / similar images
+GMAIL_DUMP_DIR = BASE_DIR / 'gmail_attachments_dump'
 
 # Settings
 MIN_FILE_SIZE_MB = int(os.getenv('MIN_FILE_SIZE_MB', 5))
@@ -42,11 +49,28 @@ MIN_FILE_SIZE_BYTES = MIN_FILE_SIZE_MB * 1024 * 1024
 FACE_RECOGNITION_TOLERANCE = float(os.getenv('FACE_RECOGNITION_TOLERANCE', 0.6))
 
 # Duplicate detection settings
-SIMILARITY_THRESHOLD = float(os.getenv('SIMILARITY_THRESHOLD', 0.95))  # For image similarity
+SIMILARITY_THRESHOLD = float(os.getenv('SIMILARITY_THRESHOLD', 0.90))  # For image similarity
+MIN_IMAGE_SIZE_KB = int(os.getenv('MIN_IMAGE_SIZE_KB', 50))  # Smaller images aren't hashed (little space to win)
 BATCH_SIZE = int(os.getenv('BATCH_SIZE', 100))  # Files to process at once
+DUMP_WORKERS = int(os.getenv('DUMP_WORKERS', 8))  # Parallel groups during dump & delete
+HASH_IO_WORKERS = int(os.getenv('HASH_IO_WORKERS', 32))  # Concurrent image downloads while hashing
+DRIVE_BATCH_SIZE = 100  # Drive batch requests accept at most 100 calls
+DRIVE_LIST_PAGE_SIZE = 1000  # files.list maximum; fewer round trips per listing
+
+# Partial-response masks for files.list - only what the finders read.
+# Any new metadata used from a listing must be added here first.
+DRIVE_LIST_FIELDS = "nextPageToken, files(id, name, mimeType, size, md5Checksum, createdTime, modifiedTime, webViewLink)"
+DRIVE_IMAGE_LIST_FIELDS = "nextPageToken, files(id, name, size, md5Checksum, modifiedTime)"
+DRIVE_IMAGE_DUMP_FIELDS = "createdTime, webViewLink"  # Fetched only for images about to be dumped
+DRIVE_CHANGES_FIELDS = ("nextPageToken, newStartPageToken, changes(fileId, removed, file(id, name, mimeType, "
+                        "size, md5Checksum, createdTime, modifiedTime, webViewLink, trashed, ownedByMe))")
+REPORT_BUFFER_SIZE = 1 << 20  # Write buffer for report files (bytes)
 
 # Gmail settings
+GMAIL_MIN_ATTACHMENT_SIZE_MB = 5
+GMAIL_MAX_RESULTS = 500
 GMAIL_BATCH_DELETE_SIZE = int(os.getenv('GMAIL_BATCH_DELETE_SIZE', 100))
+GMAIL_BATCH_GET_SIZE = int(os.getenv('GMAIL_BATCH_GET_SIZE', 50))  # messages.get per batch (Gmail advises <= 50)
 GMAIL_CATEGORIES_TO_CLEAN = os.getenv(
     'GMAIL_CATEGORIES_TO_CLEAN', 
     'SPAM,CATEGORY_PROMOTIONS,CATEGORY_SOCIAL'
@@ -56,26 +80,26 @@ GMAIL_CATEGORIES_TO_CLEAN = os.getenv(
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 GROQ_API_KEY = os.getenv('GROQ_API_KEY')
 
-# File type filters
-IMAGE_MIMETYPES = [
+# File type filters (immutable; order is kept so queries run in a stable order)
+IMAGE_MIMETYPES = (
     'image/jpeg',
     'image/png',
     'image/gif',
     'image/bmp',
     'image/webp',
     'image/tiff'
-]
+)
 
-VIDEO_MIMETYPES = [
+VIDEO_MIMETYPES = (
     'video/mp4',
     'video/mpeg',
     'video/quicktime',
     'video/x-msvideo',
     'video/x-matroska',
     'video/webm'
-]
+)
 
-DOCUMENT_MIMETYPES = [
+DOCUMENT_MIMETYPES = (
     'application/pdf',
     'application/msword',
     'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
@@ -83,24 +107,4 @@ DOCUMENT_MIMETYPES = [
     'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
     'application/vnd.ms-powerpoint',
     'application/vnd.openxmlformats-officedocument.presentationml.presentation'
-]
-
-# Similarity settings
-SIMILARITY_THRESHOLD = 0.90
-
-# Gmail settings
-GMAIL_MIN_ATTACHMENT_SIZE_MB = 5
-GMAIL_MAX_RESULTS = 500
-
-# Directory settings
-BASE_DIR = Path(__file__).parent
-DUPLICATES_DUMP_DIR = BASE_DIR / 'duplicates_dump'
-GMAIL_DUMP_DIR = BASE_DIR / 'gmail_attachments_dump'
-TEMP_DIR = BASE_DIR / 'temp'
-
-# Create directories
-DUPLICATES_DUMP_DIR.mkdir(exist_ok=True)
-GMAIL_DUMP_DIR.mkdir(exist_ok=True)
-TEMP_DIR.mkdir(exist_ok=True)
-
-print(f"✅ {PROJECT_NAME} v{VERSION} - Config loaded")
\ No newline at end of file
+)
\ No newline at end of file
@@ -0,0 +1,130 @@
+"""
+Batched Drive Deletion
+Dump-and-delete loop shared by the duplicate and similar-image finders
+"""
+import logging
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from auth import get_drive_service
+from config import DRIVE_BATCH_SIZE, DUMP_WORKERS
+
+logger = logging.getLogger(__name__)
+
+# README status for each reason a downloaded file was left in Drive
+SKIP_REASONS = {
+    'no_permission': 'No permission - shared file',
+    'delete_failed': 'Delete failed - run the dump again',
+}
+
+
+def chunk_groups(groups: List[Dict], batch_size: int) -> Iterator[List[Dict]]:
+    """Split groups into chunks holding roughly batch_size files to delete."""
+    chunk = []
+    pending = 0
+    for group in groups:
+        chunk.append(group)
+        pending += len(group['files']) - 1
+        if pending >= batch_size:
+            yield chunk
+            chunk = []
+            pending = 0
+    if chunk:
+        yield chunk
+
+
+def batch_delete(downloaded: List[Dict], batch_size: int = DRIVE_BATCH_SIZE) -> Dict[str, Optional[Exception]]:
+    """
+    Delete files through Drive batch requests (up to batch_size per HTTP call).
+    
+    Args:
+        downloaded: Downloaded file records (need 'id')
+        batch_size: Deletes per batch request (Drive allows at most 100)
+    
+    Returns:
+        Dictionary mapping file_id to None on success or the error
+    """
+    service = get_drive_service()
+    outcomes = {}
+    
+    def callback(request_id, response, exception):
+        outcomes[request_id] = exception
+    
+    for start in range(0, len(downloaded), batch_size):
+        batch = service.new_batch_http_request(callback=callback)
+        for d in downloaded[start:start + batch_size]:
+            batch.add(service.files().delete(fileId=d['id']), request_id=d['id'])
+        try:
+            batch.execute()
+        except Exception as e:
+            logger.error(f"Batch delete failed: {e}")
+            for d in downloaded[start:start + batch_size]:
+                outcomes.setdefault(d['id'], e)
+    
+    return outcomes
+
+
+def split_delete_outcomes(downloaded: List[Dict],
+                          outcomes: Dict[str, Optional[Exception]]) -> Tuple[List[str], List[Dict]]:
+    """
+    Sort a group's downloaded files into deleted and skipped.
+    
+    Args:
+        downloaded: The group's downloaded file records (need 'id' and 'name')
+        outcomes: Result of batch_delete()
+    
+    Returns:
+        (IDs deleted from Drive, skipped records with a 'reason' of
+        'no_permission' for 403 errors or 'delete_failed' otherwise)
+    """
+    deleted_from_drive = []
+    skipped = []
+    for d in downloaded:
+        error = outcomes.get(d['id'])
+        if d['id'] in outcomes and error is None:
+            deleted_from_drive.append(d['id'])
+        else:
+            # Permission error (403) - file is shared/not owned
+            status = getattr(getattr(error, 'resp', None), 'status', None)
+            skipped.append({
+                'id': d['id'],
+                'name': d['name'],
+                'reason': 'no_permission' if status == 403 else 'delete_failed'
+            })
+    return deleted_from_drive, skipped
+
+
+def batch_dump_and_delete(groups: List[Dict], download_group: Callable[[Dict], Dict],
+                          finish_group: Callable[[Dict, Dict, List[str], List[Dict]], Dict],
+                          batch_size: int = DRIVE_BATCH_SIZE, workers: int = DUMP_WORKERS,
+                          prepare_chunk: Optional[Callable[[List[Dict]], None]] = None) -> Iterator[Dict]:
+    """
+    Dump and delete many groups, batching the Drive deletions.
+    
+    Groups are handled in chunks of about batch_size files: every non-kept
+    file in the chunk is downloaded concurrently, then the downloaded files
+    are deleted with one batch request per batch_size files.
+    
+    Args:
+        groups: Groups from a finder's calculate_wasted_space()
+        download_group: Downloads one group's non-kept files, returns the partial result
+        finish_group: Called with (group, partial, deleted IDs, skipped records),
+            returns the group's final result
+        batch_size: Deletes per batch request (Drive allows at most 100)
+        workers: Groups downloaded in parallel
+        prepare_chunk: Optional hook run on each chunk before it is downloaded
+    
+    Yields:
+        The finish_group() result for each group, in order
+    """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for chunk in chunk_groups(groups, batch_size):
+            if prepare_chunk:
+                prepare_chunk(chunk)
+            partials = list(executor.map(download_group, chunk))
+            
+            downloaded = [d for partial in partials for d in partial['downloaded']]
+            outcomes = batch_delete(downloaded, batch_size)
+            
+            for group, partial in zip(chunk, partials):
+                deleted_from_drive, skipped_no_permission = split_delete_outcomes(partial['downloaded'], outcomes)
+                yield finish_group(group, partial, deleted_from_drive, skipped_no_permission)
@@ -2,38 +2,121 @@
 Google Drive Duplicate File Finder
 Uses MD5 hashing to identify exact duplicates
 """
+import hashlib
 import logging
 import os
-from typing import List, Dict, Set
+import shutil
+import sys
+import threading
+import time
+from typing import List, Dict, Set, Iterator, Optional
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from pathlib import Path
-from googleapiclient.discovery import build
+import numpy as np
 from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaIoBaseDownload
-from auth import get_credentials
-from config import IMAGE_MIMETYPES, VIDEO_MIMETYPES, DOCUMENT_MIMETYPES, DUPLICATES_DUMP_DIR
-from tqdm import tqdm
+from auth import get_drive_service, get_media_session
+from result_cache import disk_memo, digest_pairs
+from drive_batch import SKIP_REASONS, batch_dump_and_delete
+from file_index import FileIndex
+from config import (IMAGE_MIMETYPES, VIDEO_MIMETYPES, DOCUMENT_MIMETYPES, DUPLICATES_DUMP_DIR,
+                    DRIVE_BATCH_SIZE, DUMP_WORKERS, REPORT_BUFFER_SIZE, DRIVE_LIST_PAGE_SIZE, DRIVE_LIST_FIELDS,
+                    DRIVE_CHANGES_FIELDS)
 import io
 
 logging.basicConfig(level=logging.ERROR)  # Suppress warnings
 logger = logging.getLogger(__name__)
 
+# Disjoint MIME-type shards that together cover every file
+_MIME_FAMILIES = ['image/', 'video/', 'audio/', 'application/', 'text/']
+LIST_SHARDS = [f"mimeType contains '{family}'" for family in _MIME_FAMILIES] + [
+    " and ".join(f"not mimeType contains '{family}'" for family in _MIME_FAMILIES)
+]
+
+# Large files are fetched as concurrent byte ranges written in place
+RANGE_DOWNLOAD_MIN_BYTES = 64 * 1024 * 1024  # Smaller files use one stream
+RANGE_PART_BYTES = 16 * 1024 * 1024  # Bytes per range request
+RANGE_WORKERS = 8  # Concurrent range requests across all downloads
+RANGE_RETRIES = 3  # Retries per range on 429/5xx (exponential backoff)
+RANGE_STREAM_BYTES = 1024 * 1024  # Bytes held in memory per range while it streams to disk
+RANGE_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+_RANGE_SLOTS = threading.BoundedSemaphore(RANGE_WORKERS)
+
+# Files without a Drive MD5 are compared on a prefix hash before a full one
+PREFIX_HASH_BYTES = 16 * 1024
+GOOGLE_APPS_MIMETYPE = 'application/vnd.google-apps.'  # Native Docs/Sheets can't be downloaded raw
+FOLDER_MIMETYPE = 'application/vnd.google-apps.folder'
+
+# Fields changes() returns only to decide membership; not kept in the listing
+_CHANGE_ONLY_FIELDS = ('trashed', 'ownedByMe')
+
+
+def _preallocate(fh, size: int):
+    """
+    Reserve size bytes for a file being downloaded.
+    
+    Uses posix_fallocate where available so the file is laid out in one
+    go; elsewhere the file is just extended to its final size.
+    
+    Args:
+        fh: Open binary file
+        size: Expected file size in bytes (0 = unknown, do nothing)
+    """
+    if size <= 0:
+        return
+    if hasattr(os, 'posix_fallocate'):
+        try:
+            os.posix_fallocate(fh.fileno(), 0, size)
+            return
+        except OSError:
+            pass  # e.g. filesystem without fallocate support
+    fh.truncate(size)
+
+
+class _DigestWriter:
+    """File-like sink that hashes downloaded chunks instead of storing them."""
+    
+    def __init__(self):
+        self.digest = hashlib.blake2b(digest_size=16)
+    
+    def write(self, data):
+        self.digest.update(data)
+        return len(data)
+
 
 class DriveDuplicateFinder:
     """Find and manage duplicate files in Google Drive."""
     
-    def __init__(self):
-        self.service = build('drive', 'v3', credentials=get_credentials())
+    def __init__(self, file_index: Optional[FileIndex] = None):
+        """
+        Initialize finder.
+        
+        Args:
+            file_index: Optional snapshot of the last listing; when given,
+                later listings only fetch Drive changes since then
+        """
+        self.file_index = file_index
+        self._listing_complete = True
         self.files_by_hash = defaultdict(list)
         self.total_files = 0
         self.total_size = 0
     
-    def list_all_files(self, page_size: int = 100) -> List[Dict]:
+    @property
+    def service(self):
+        """Drive service for the calling thread, shared with the other finders."""
+        return get_drive_service()
+    
+    def _list_query(self, query: str, page_size: int, fields: str, on_page=None) -> List[Dict]:
         """
-        List all files in Drive with MD5 checksums.
+        Page through one files.list query.
         
         Args:
+            query: Drive search query
             page_size: Number of files per page
+            fields: Partial-response field mask
+            on_page: Optional callback receiving each page's file count
         
         Returns:
             List of file metadata dictionaries
@@ -41,24 +124,20 @@ class DriveDuplicateFinder:
         files = []
         page_token = None
         
-        # Query for files with MD5 hash + files you own
-        query = "trashed=false and mimeType != 'application/vnd.google-apps.folder' and 'me' in owners"
-        
-        print("📁 Scanning Google Drive for files you own...")
-        
         try:
             while True:
                 response = self.service.files().list(
                     q=query,
                     pageSize=page_size,
                     pageToken=page_token,
-                    fields="nextPageToken, files(id, name, mimeType, size, md5Checksum, createdTime, modifiedTime, parents, webViewLink, ownedByMe)"
+                    fields=fields,
+                    prettyPrint=False  # Compact JSON; responses are already gzipped
                 ).execute()
                 
                 batch = response.get('files', [])
                 files.extend(batch)
-                
-                print(f"   Found {len(files)} files...", end='\r')
+                if on_page:
+                    on_page(len(batch))
                 
                 page_token = response.get('nextPageToken')
                 if not page_token:
@@ -66,12 +145,155 @@ class DriveDuplicateFinder:
         
         except HttpError as e:
             logger.error(f"HTTP Error listing files: {e}")
+            self._listing_complete = False
         except Exception as e:
             logger.error(f"Error listing files: {e}")
+            self._listing_complete = False
+        
+        return files
+    
+    def list_all_files(self, page_size: int = DRIVE_LIST_PAGE_SIZE, full_scan: bool = False) -> List[Dict]:
+        """
+        List all files in Drive with MD5 checksums.
+        
+        With a file index that holds a previous listing, only the changes
+        since then are fetched and applied. Otherwise (or with full_scan)
+        everything is listed and the index is refreshed.
+        
+        Args:
+            page_size: Number of files per page
+            full_scan: Ignore the saved listing and list everything
+        
+        Returns:
+            List of file metadata dictionaries
+        """
+        if self.file_index is None:
+            return self._list_everything(page_size)
+        
+        token = None if full_scan else self.file_index.get_page_token()
+        if token:
+            files = self._list_changes(token, page_size)
+            if files is not None:
+                return files
+        
+        # Take the token first so changes made during the listing are replayed next time
+        start_token = self._start_page_token()
+        files = self._list_everything(page_size)
+        if start_token and self._listing_complete:
+            self.file_index.replace_all(files, start_token)
+        return files
+    
+    def _start_page_token(self) -> Optional[str]:
+        """Current changes() start token, or None if it can't be fetched."""
+        try:
+            return self.service.changes().getStartPageToken().execute()['startPageToken']
+        except Exception as e:
+            logger.error(f"Error fetching changes start token: {e}")
+            return None
+    
+    def _list_changes(self, page_token: str, page_size: int) -> Optional[List[Dict]]:
+        """
+        Bring the file index up to date from Drive's changes feed.
+        
+        Args:
+            page_token: Token saved with the index
+            page_size: Number of changes per page
+        
+        Returns:
+            Updated list of file metadata, or None if the feed could not be
+            read (the caller falls back to a full listing)
+        """
+        print("📁 Fetching Drive changes since the last scan...")
+        
+        upserts = {}
+        removals = set()
+        new_start_token = None
         
+        try:
+            while page_token:
+                response = self.service.changes().list(
+                    pageToken=page_token,
+                    pageSize=page_size,
+                    spaces='drive',
+                    includeRemoved=True,
+                    fields=DRIVE_CHANGES_FIELDS,
+                    prettyPrint=False
+                ).execute()
+                
+                for change in response.get('changes', []):
+                    file_id = change['fileId']
+                    file = change.get('file')
+                    if change.get('removed') or not file or not self._in_listing(file):
+                        upserts.pop(file_id, None)
+                        removals.add(file_id)
+                    else:
+                        removals.discard(file_id)
+                        upserts[file_id] = {k: v for k, v in file.items() if k not in _CHANGE_ONLY_FIELDS}
+                
+                new_start_token = response.get('newStartPageToken', new_start_token)
+                page_token = response.get('nextPageToken')
+        
+        except Exception as e:
+            logger.error(f"Error listing Drive changes: {e}")
+            return None
+        
+        self.file_index.apply_changes(upserts.values(), removals, new_start_token)
+        files = self.file_index.all_files()
+        print(f"✅ {len(upserts)} changed, {len(removals)} removed - total files: {len(files)}")
+        return files
+    
+    @staticmethod
+    def _in_listing(file: Dict) -> bool:
+        """Whether a changed file matches the full listing's query."""
+        return (not file.get('trashed') and file.get('ownedByMe', False)
+                and file.get('mimeType') != FOLDER_MIMETYPE)
+    
+    def _list_everything(self, page_size: int) -> List[Dict]:
+        """
+        List every file you own, without the index.
+        
+        The listing is split into shards by MIME type family which are
+        paginated concurrently, so wall time follows the largest shard
+        instead of the total page count.
+        
+        Args:
+            page_size: Number of files per page
+        
+        Returns:
+            List of file metadata dictionaries
+        """
+        # Query for files with MD5 hash + files you own
+        query = f"trashed=false and mimeType != '{FOLDER_MIMETYPE}' and 'me' in owners"
+        self._listing_complete = True
+        fields = DRIVE_LIST_FIELDS
+        
+        print("📁 Scanning Google Drive for files you own...")
+        
+        lock = threading.Lock()
+        found = [0]
+        
+        def on_page(count):
+            with lock:
+                found[0] += count
+                print(f"   Found {found[0]} files...", end='\r')
+        
+        shards = [f"{query} and {shard}" for shard in LIST_SHARDS]
+        with ThreadPoolExecutor(max_workers=len(shards)) as executor:
+            results = executor.map(lambda q: self._list_query(q, page_size, fields, on_page), shards)
+            
+            # Shards are disjoint, but key by ID so an overlap can never double count
+            files_by_id = {}
+            for shard_files in results:
+                for file in shard_files:
+                    # A few dozen MIME types repeat across every file; share one string each
+                    file['mimeType'] = sys.intern(file.get('mimeType', ''))
+                    files_by_id[file['id']] = file
+        
+        files = list(files_by_id.values())
         print(f"\n✅ Total files found: {len(files)}")
         return files
     
+    @disk_memo(key=lambda self, files: digest_pairs((f['id'], f.get('modifiedTime', '')) for f in files))
     def find_duplicates(self, files: List[Dict]) -> Dict[str, List[Dict]]:
         """
         Find duplicate files by MD5 hash.
@@ -85,16 +307,17 @@ class DriveDuplicateFinder:
         print("🔍 Analyzing files for duplicates...")
         
         hash_map = defaultdict(list)
-        files_without_hash = 0
+        files_without_hash = []
         
-        pbar = tqdm(files, desc="Processing", ncols=80, bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt}')
-        for file in pbar:
+        # Pure dict inserts: a per-item progress bar would cost more than the loop
+        for file in files:
             md5 = file.get('md5Checksum')
             
-            if md5:
+            if not md5:
+                files_without_hash.append(file)
+            elif int(file.get('size', 0)) > 0:
+                # Empty files share one MD5 but waste nothing, so don't group them
                 hash_map[md5].append(file)
-            else:
-                files_without_hash += 1
         
         # Filter to only duplicates (hash appears more than once)
         duplicates = {
@@ -103,12 +326,90 @@ class DriveDuplicateFinder:
             if len(file_list) > 1
         }
         
+        content_duplicates = self._group_by_content(files_without_hash)
+        duplicates.update(content_duplicates)
+        
         print(f"✅ Found {len(duplicates)} groups of duplicates")
         if files_without_hash:
-            print(f"   Note: {files_without_hash} files without MD5 (Google Docs, Sheets, etc.)")
+            print(f"   Note: {len(files_without_hash)} files without MD5 (Google Docs, Sheets, etc.)")
+        if content_duplicates:
+            print(f"   {len(content_duplicates)} of the groups matched by content hash instead")
         
         return duplicates
     
+    def _group_by_content(self, files: List[Dict]) -> Dict[str, List[Dict]]:
+        """
+        Find duplicates among downloadable files that Drive reports no MD5 for.
+        
+        Files are bucketed by size, then by a hash of their first
+        PREFIX_HASH_BYTES (one small Range request each); only files that
+        still collide are downloaded and hashed in full.
+        
+        Args:
+            files: File metadata without md5Checksum
+        
+        Returns:
+            Dictionary mapping content hash (hex) to list of duplicate files
+        """
+        by_size = defaultdict(list)
+        for file in files:
+            size = int(file.get('size', 0))
+            if size and not file.get('mimeType', '').startswith(GOOGLE_APPS_MIMETYPE):
+                by_size[size].append(file)
+        
+        candidates = [f for group in by_size.values() if len(group) > 1 for f in group]
+        if not candidates:
+            return {}
+        
+        print(f"🔍 Comparing {len(candidates)} same-size files without MD5 by content...")
+        
+        with ThreadPoolExecutor(max_workers=DUMP_WORKERS) as executor:
+            by_prefix = defaultdict(list)
+            for file, digest in zip(candidates, executor.map(self._prefix_digest, candidates)):
+                if digest:
+                    by_prefix[(int(file['size']), digest)].append(file)
+            
+            by_content = defaultdict(list)
+            to_hash = []
+            for (size, digest), group in by_prefix.items():
+                if len(group) < 2:
+                    continue
+                if size <= PREFIX_HASH_BYTES:
+                    # The prefix already covered the whole file
+                    by_content[digest].extend(group)
+                else:
+                    to_hash.extend(group)
+            
+            for file, digest in zip(to_hash, executor.map(self._full_digest, to_hash)):
+                if digest:
+                    by_content[digest].append(file)
+        
+        return {digest: group for digest, group in by_content.items() if len(group) > 1}
+    
+    def _prefix_digest(self, file: Dict) -> Optional[str]:
+        """Hash the first PREFIX_HASH_BYTES of a file (None on error)."""
+        try:
+            request = self.service.files().get_media(fileId=file['id'])
+            request.headers['range'] = f"bytes=0-{PREFIX_HASH_BYTES - 1}"
+            data = request.execute(num_retries=RANGE_RETRIES)
+            return hashlib.blake2b(data, digest_size=16).hexdigest()
+        except Exception as e:
+            logger.error(f"Error reading {file.get('name', file['id'])}: {e}")
+            return None
+    
+    def _full_digest(self, file: Dict) -> Optional[str]:
+        """Hash a whole file while streaming it (None on error)."""
+        try:
+            sink = _DigestWriter()
+            downloader = MediaIoBaseDownload(sink, self.service.files().get_media(fileId=file['id']))
+            done = False
+            while not done:
+                status, done = downloader.next_chunk(num_retries=RANGE_RETRIES)
+            return sink.digest.hexdigest()
+        except Exception as e:
+            logger.error(f"Error hashing {file.get('name', file['id'])}: {e}")
+            return None
+    
     def calculate_wasted_space(self, duplicates: Dict[str, List[Dict]]) -> Dict:
         """
         Calculate space wasted by duplicates.
@@ -119,39 +420,43 @@ class DriveDuplicateFinder:
         Returns:
             Statistics about wasted space
         """
-        total_wasted_bytes = 0
-        total_duplicate_files = 0
-        duplicate_groups = []
+        hashes = list(duplicates)
+        groups = list(duplicates.values())
         
-        for md5_hash, file_group in duplicates.items():
-            # Get file size (all duplicates have same size)
-            file_size = int(file_group[0].get('size', 0))
-            
-            if file_size == 0:
-                continue
-            
-            # Count duplicates (keep one, rest are wasted)
-            num_duplicates = len(file_group)
-            wasted_size = file_size * (num_duplicates - 1)
-            
-            total_wasted_bytes += wasted_size
-            total_duplicate_files += num_duplicates
-            
+        # Per-group columns (all duplicates in a group have the same size)
+        sizes = np.fromiter((int(g[0].get('size', 0)) for g in groups), dtype=np.int64, count=len(groups))
+        counts = np.fromiter((len(g) for g in groups), dtype=np.int64, count=len(groups))
+        
+        # Keep one copy, the rest are wasted; size-0 groups (native Docs) are skipped
+        wasted = sizes * (counts - 1)
+        keep = np.flatnonzero(sizes > 0)
+        
+        # Biggest impact first; stable so ties keep listing order
+        order = keep[np.argsort(-wasted[keep], kind='stable')]
+        
+        total_wasted_bytes = int(wasted[keep].sum())
+        total_duplicate_files = int(counts[keep].sum())
+        
+        duplicate_groups = []
+        for i in order.tolist():
+            file_group = groups[i]
+            file_size = int(sizes[i])
+            # Groups matched by _group_by_content are keyed by a BLAKE2b digest, not an MD5
+            has_md5 = bool(file_group[0].get('md5Checksum'))
+            wasted_size = int(wasted[i])
             duplicate_groups.append({
                 'filename': file_group[0].get('name'),
                 'mime_type': file_group[0].get('mimeType'),
                 'file_size_bytes': file_size,
                 'file_size_mb': file_size / (1024 * 1024),
-                'num_copies': num_duplicates,
+                'num_copies': len(file_group),
                 'wasted_bytes': wasted_size,
                 'wasted_mb': wasted_size / (1024 * 1024),
                 'files': file_group,
-                'md5': md5_hash
+                'md5': hashes[i] if has_md5 else None,
+                'content_hash': None if has_md5 else hashes[i]
             })
         
-        # Sort by wasted space (biggest impact first)
-        duplicate_groups.sort(key=lambda x: x['wasted_bytes'], reverse=True)
-        
         return {
             'total_duplicate_files': total_duplicate_files,
             'total_duplicate_groups': len(duplicates),
@@ -161,26 +466,87 @@ class DriveDuplicateFinder:
             'duplicate_groups': duplicate_groups
         }
     
-    def download_file(self, file_id: str, destination: str, file_name: str = None) -> bool:
+    def _download_ranges(self, file_id: str, destination: str, size: int):
+        """
+        Download a file as concurrent byte ranges into a pre-sized local file.
+        
+        Args:
+            file_id: Google Drive file ID
+            destination: Local file path
+            size: File size in bytes
+        
+        Raises:
+            Exception: If any range fails after its retries
+        """
+        with open(destination, 'wb') as fh:
+            _preallocate(fh, size)
+        
+        uri = self.service.files().get_media(fileId=file_id).uri
+        
+        def fetch(start):
+            end = min(start + RANGE_PART_BYTES, size) - 1
+            # Parallel downloads share RANGE_WORKERS slots
+            with _RANGE_SLOTS:
+                for attempt in range(RANGE_RETRIES + 1):
+                    with get_media_session().get(uri, headers={'Range': f"bytes={start}-{end}"},
+                                                 stream=True) as response:
+                        if response.status_code in RANGE_RETRY_STATUSES and attempt < RANGE_RETRIES:
+                            time.sleep(2 ** attempt)
+                            continue
+                        response.raise_for_status()
+                        if response.status_code != 206:
+                            raise ValueError(f"range request at offset {start} returned {response.status_code}")
+                        
+                        written = 0
+                        with open(destination, 'r+b') as fh:
+                            fh.seek(start)
+                            for block in response.iter_content(RANGE_STREAM_BYTES):
+                                fh.write(block)
+                                written += len(block)
+                    break
+            
+            if written != end - start + 1:
+                raise ValueError(f"expected {end - start + 1} bytes at offset {start}, got {written}")
+        
+        with ThreadPoolExecutor(max_workers=RANGE_WORKERS) as pool:
+            for _ in pool.map(fetch, range(0, size, RANGE_PART_BYTES)):
+                pass
+    
+    def download_file(self, file_id: str, destination: str, file_name: str = None, size: int = 0) -> bool:
         """
         Download a file from Drive (silent, no progress bar).
         
+        Files of RANGE_DOWNLOAD_MIN_BYTES or more are fetched as parallel
+        byte ranges, falling back to a single stream if that fails.
+        
         Args:
             file_id: Google Drive file ID
             destination: Local file path
             file_name: Optional file name for error logging
+            size: File size in bytes, if known
         
         Returns:
             True if successful, False otherwise
         """
+        if size >= RANGE_DOWNLOAD_MIN_BYTES:
+            try:
+                self._download_ranges(file_id, destination, size)
+                return True
+            except Exception as e:
+                logger.error(f"Ranged download of {file_name or file_id} failed, retrying as one stream: {e}")
+        
         try:
             request = self.service.files().get_media(fileId=file_id)
             
             with io.FileIO(destination, 'wb') as fh:
+                _preallocate(fh, size)
+                # Each chunk (up to 100 MB by default) arrives as one request and one write
                 downloader = MediaIoBaseDownload(fh, request)
                 done = False
                 while not done:
                     status, done = downloader.next_chunk()
+                # Drop any preallocated tail if Drive sent fewer bytes than listed
+                fh.truncate(fh.tell())
             
             return True
         
@@ -210,31 +576,27 @@ class DriveDuplicateFinder:
         except Exception as e:
             return False
     
-    def dump_and_delete_duplicates(self, duplicate_group: Dict, keep_index: int = 0) -> Dict:
+    def _download_group(self, duplicate_group: Dict, keep_index: int = 0) -> Dict:
         """
-        Download duplicate files locally, then DELETE from Drive.
-        
-        IMPORTANT: This DELETES files from Drive after downloading!
+        Download every non-kept file of a duplicate group into its dump folder.
         
         Args:
             duplicate_group: Group of duplicate files
-            keep_index: Index of file to keep in Drive (default: 0 = keep first/oldest)
+            keep_index: Index of file to keep in Drive
         
         Returns:
-            Results of dump+delete operation
+            Partial results: dump folder, downloaded and failed files
         """
         files = duplicate_group['files']
-        md5 = duplicate_group['md5']
-        base_filename = duplicate_group['filename']
+        group_hash = duplicate_group['md5'] or duplicate_group['content_hash']
         
         # Create subfolder for this duplicate group
-        dump_folder = DUPLICATES_DUMP_DIR / md5[:8]
-        dump_folder.mkdir(exist_ok=True)
+        dump_folder = DUPLICATES_DUMP_DIR / group_hash[:8]
+        dump_folder.mkdir(parents=True, exist_ok=True)
         
         downloaded = []
-        deleted_from_drive = []
         failed = []
-        skipped_no_permission = []
+        first_copy = None  # Every copy has the same content, so only one is fetched from Drive
         
         for i, file in enumerate(files):
             file_id = file['id']
@@ -250,8 +612,15 @@ class DriveDuplicateFinder:
             local_filename = f"{name_parts[0]}_copy{i+1}{name_parts[1]}"
             local_path = dump_folder / local_filename
             
-            # Download (silent)
-            if self.download_file(file_id, str(local_path), file_name):
+            if first_copy is not None and self._copy_local(first_copy, local_path):
+                ok = True
+            else:
+                # Download (silent)
+                ok = self.download_file(file_id, str(local_path), file_name, file_size)
+                if ok:
+                    first_copy = local_path
+            
+            if ok:
                 downloaded.append({
                     'id': file_id,
                     'name': file_name,
@@ -259,17 +628,6 @@ class DriveDuplicateFinder:
                     'local_path': str(local_path),
                     'created': file.get('createdTime', 'Unknown')[:10]
                 })
-                
-                # Delete from Drive after successful download
-                if self.delete_file(file_id):
-                    deleted_from_drive.append(file_id)
-                else:
-                    # Permission error - file is shared/not owned
-                    skipped_no_permission.append({
-                        'id': file_id,
-                        'name': file_name,
-                        'reason': 'no_permission'
-                    })
             else:
                 failed.append({
                     'id': file_id,
@@ -277,38 +635,95 @@ class DriveDuplicateFinder:
                     'reason': 'download_failed'
                 })
         
+        return {
+            'dump_folder': dump_folder,
+            'downloaded': downloaded,
+            'failed': failed
+        }
+    
+    @staticmethod
+    def _copy_local(source: Path, destination: Path) -> bool:
+        """
+        Copy an already-downloaded duplicate instead of fetching it again.
+        
+        Args:
+            source: Local copy of a file with the same content
+            destination: Local file path
+        
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            shutil.copyfile(source, destination)
+            return True
+        except OSError as e:
+            logger.error(f"Error copying {source} to {destination}: {e}")
+            return False
+    
+    def _finish_group(self, duplicate_group: Dict, keep_index: int, partial: Dict,
+                      deleted_from_drive: List[str], skipped_no_permission: List[Dict]) -> Dict:
+        """
+        Write the group's README and assemble its dump+delete results.
+        
+        Args:
+            duplicate_group: Group of duplicate files
+            keep_index: Index of file kept in Drive
+            partial: Output of _download_group()
+            deleted_from_drive: IDs deleted from Drive
+            skipped_no_permission: Files that could not be deleted
+        
+        Returns:
+            Results of dump+delete operation
+        """
+        files = duplicate_group['files']
+        base_filename = duplicate_group['filename']
+        dump_folder = partial['dump_folder']
+        downloaded = partial['downloaded']
+        failed = partial['failed']
+        skip_reasons = {s['id']: s['reason'] for s in skipped_no_permission}
+        
         # Create README in dump folder
         readme_path = dump_folder / 'README.txt'
+        deleted_ids = set(deleted_from_drive)
+        
+        parts = [
+            f"Duplicate Files: {base_filename}\n",
+            f"MD5 Hash: {duplicate_group['md5']}\n" if duplicate_group['md5']
+            else f"Content Hash (BLAKE2b): {duplicate_group['content_hash']}\n",
+            f"File Size: {duplicate_group['file_size_mb']:.2f} MB each\n",
+            f"Total Copies: {duplicate_group['num_copies']}\n",
+            f"Wasted Space Recovered: {duplicate_group['wasted_mb']:.2f} MB\n",
+            f"\nProcessed: {len(files)} files\n",
+            f"Downloaded: {len(downloaded)} files\n",
+            f"Deleted from Drive: {len(deleted_from_drive)} files\n",
+            f"Kept in Drive: 1 file\n",
+            f"Skipped (no permission): {list(skip_reasons.values()).count('no_permission')} files\n",
+            f"Skipped (delete failed): {list(skip_reasons.values()).count('delete_failed')} files\n",
+            f"Failed: {len(failed)} files\n\n",
+            "=" * 70 + "\n",
+            "Files:\n",
+            "=" * 70 + "\n\n",
+        ]
+        for i, file in enumerate(files, 1):
+            if i-1 == keep_index:
+                status = "✅ KEPT IN DRIVE"
+            elif file['id'] in deleted_ids:
+                status = "🗑️  DOWNLOADED & DELETED FROM DRIVE"
+            elif file['id'] in skip_reasons:
+                status = f"⚠️  SKIPPED ({SKIP_REASONS[skip_reasons[file['id']]]})"
+            else:
+                status = "❌ FAILED"
+            
+            parts.append(
+                f"{i}. {file['name']} ({status})\n"
+                f"   ID: {file['id']}\n"
+                f"   Size: {int(file.get('size', 0)) / (1024 * 1024):.2f} MB\n"
+                f"   Created: {file.get('createdTime', 'Unknown')[:10]}\n"
+                f"   Link: {file.get('webViewLink', 'N/A')}\n\n"
+            )
+        
         with open(readme_path, 'w', encoding='utf-8') as f:
-            f.write(f"Duplicate Files: {base_filename}\n")
-            f.write(f"MD5 Hash: {md5}\n")
-            f.write(f"File Size: {duplicate_group['file_size_mb']:.2f} MB each\n")
-            f.write(f"Total Copies: {duplicate_group['num_copies']}\n")
-            f.write(f"Wasted Space Recovered: {duplicate_group['wasted_mb']:.2f} MB\n")
-            f.write(f"\nProcessed: {len(files)} files\n")
-            f.write(f"Downloaded: {len(downloaded)} files\n")
-            f.write(f"Deleted from Drive: {len(deleted_from_drive)} files\n")
-            f.write(f"Kept in Drive: 1 file\n")
-            f.write(f"Skipped (no permission): {len(skipped_no_permission)} files\n")
-            f.write(f"Failed: {len(failed)} files\n\n")
-            f.write("=" * 70 + "\n")
-            f.write("Files:\n")
-            f.write("=" * 70 + "\n\n")
-            for i, file in enumerate(files, 1):
-                if i-1 == keep_index:
-                    status = "✅ KEPT IN DRIVE"
-                elif file['id'] in deleted_from_drive:
-                    status = "🗑️  DOWNLOADED & DELETED FROM DRIVE"
-                elif any(s['id'] == file['id'] for s in skipped_no_permission):
-                    status = "⚠️  SKIPPED (No permission - shared file)"
-                else:
-                    status = "❌ FAILED"
-                
-                f.write(f"{i}. {file['name']} ({status})\n")
-                f.write(f"   ID: {file['id']}\n")
-                f.write(f"   Size: {int(file.get('size', 0)) / (1024 * 1024):.2f} MB\n")
-                f.write(f"   Created: {file.get('createdTime', 'Unknown')[:10]}\n")
-                f.write(f"   Link: {file.get('webViewLink', 'N/A')}\n\n")
+            f.write("".join(parts))
         
         return {
             'downloaded': downloaded,
@@ -316,53 +731,143 @@ class DriveDuplicateFinder:
             'skipped_no_permission': skipped_no_permission,
             'failed': failed,
             'dump_folder': str(dump_folder),
-            'space_freed_bytes': sum(d['size'] for d in downloaded if d['id'] in deleted_from_drive),
-            'space_freed_mb': sum(d['size'] for d in downloaded if d['id'] in deleted_from_drive) / (1024 * 1024)
+            'space_freed_bytes': sum(d['size'] for d in downloaded if d['id'] in deleted_ids),
+            'space_freed_mb': sum(d['size'] for d in downloaded if d['id'] in deleted_ids) / (1024 * 1024)
         }
     
-    def generate_report(self, stats: Dict, top_n: int = 20) -> str:
+    def dump_and_delete_duplicates(self, duplicate_group: Dict, keep_index: int = 0) -> Dict:
         """
-        Generate a human-readable report of duplicates.
+        Download duplicate files locally, then DELETE from Drive.
+        
+        IMPORTANT: This DELETES files from Drive after downloading!
+        
+        Args:
+            duplicate_group: Group of duplicate files
+            keep_index: Index of file to keep in Drive (default: 0 = keep first/oldest)
+        
+        Returns:
+            Results of dump+delete operation
+        """
+        partial = self._download_group(duplicate_group, keep_index)
+        
+        deleted_from_drive = []
+        skipped_no_permission = []
+        
+        # Delete from Drive after successful download
+        for d in partial['downloaded']:
+            if self.delete_file(d['id']):
+                deleted_from_drive.append(d['id'])
+            else:
+                # Permission error - file is shared/not owned
+                skipped_no_permission.append({
+                    'id': d['id'],
+                    'name': d['name'],
+                    'reason': 'no_permission'
+                })
+        
+        return self._finish_group(duplicate_group, keep_index, partial,
+                                  deleted_from_drive, skipped_no_permission)
+    
+    def batch_dump_and_delete_duplicates(self, duplicate_groups: List[Dict], keep_index: int = 0,
+                                         batch_size: int = DRIVE_BATCH_SIZE,
+                                         workers: int = DUMP_WORKERS) -> Iterator[Dict]:
+        """
+        Dump and delete many duplicate groups, batching the Drive deletions.
+        
+        Groups are handled in chunks of about batch_size files: every non-kept
+        file in the chunk is downloaded concurrently, then the downloaded files
+        are deleted with one batch request per batch_size files.
+        
+        IMPORTANT: This DELETES files from Drive after downloading!
+        
+        Args:
+            duplicate_groups: Groups from calculate_wasted_space()
+            keep_index: Index of file to keep in each group
+            batch_size: Deletes per batch request (Drive allows at most 100)
+            workers: Groups downloaded in parallel
+        
+        Yields:
+            Results of dump+delete operation for each group, as in
+            dump_and_delete_duplicates()
+        """
+        return batch_dump_and_delete(
+            duplicate_groups,
+            lambda group: self._download_group(group, keep_index),
+            lambda group, partial, deleted, skipped: self._finish_group(group, keep_index, partial,
+                                                                        deleted, skipped),
+            batch_size, workers)
+    
+    def iter_report_lines(self, stats: Dict, top_n: int = 20) -> Iterator[str]:
+        """
+        Yield the lines of the duplicate report one at a time.
         
         Args:
             stats: Statistics from calculate_wasted_space()
             top_n: Number of top duplicates to show
         
-        Returns:
-            Formatted report string
+        Yields:
+            Report lines (without trailing newlines); a group header is
+            yielded as one multi-line chunk
         """
-        report = []
-        report.append("=" * 70)
-        report.append("📊 GOOGLE DRIVE DUPLICATE FILE REPORT")
-        report.append("=" * 70)
-        report.append("")
+        yield "=" * 70
+        yield "📊 GOOGLE DRIVE DUPLICATE FILE REPORT"
+        yield "=" * 70
+        yield ""
         
         # Summary
-        report.append("📈 SUMMARY")
-        report.append(f"   Total duplicate files: {stats['total_duplicate_files']:,}")
-        report.append(f"   Duplicate groups: {stats['total_duplicate_groups']:,}")
-        report.append(f"   Wasted space: {stats['total_wasted_gb']:.2f} GB ({stats['total_wasted_mb']:.1f} MB)")
-        report.append("")
+        yield "📈 SUMMARY"
+        yield f"   Total duplicate files: {stats['total_duplicate_files']:,}"
+        yield f"   Duplicate groups: {stats['total_duplicate_groups']:,}"
+        yield f"   Wasted space: {stats['total_wasted_gb']:.2f} GB ({stats['total_wasted_mb']:.1f} MB)"
+        yield ""
         
         # Top duplicates
-        report.append(f"🔝 TOP {top_n} SPACE WASTERS")
-        report.append("-" * 70)
-        
-        for i, group in enumerate(stats['duplicate_groups'][:top_n], 1):
-            report.append(f"{i}. {group['filename']}")
-            report.append(f"   Type: {group['mime_type']}")
-            report.append(f"   Size: {group['file_size_mb']:.2f} MB each")
-            report.append(f"   Copies: {group['num_copies']}")
-            report.append(f"   Wasted: {group['wasted_mb']:.2f} MB")
-            report.append(f"   Files:")
+        yield f"🔝 TOP {top_n} SPACE WASTERS"
+        yield "-" * 70
+        
+        for i, group in enumerate(islice(stats['duplicate_groups'], top_n), 1):
+            # One compiled f-string per group header instead of six separate lines
+            yield (f"{i}. {group['filename']}\n"
+                   f"   Type: {group['mime_type']}\n"
+                   f"   Size: {group['file_size_mb']:.2f} MB each\n"
+                   f"   Copies: {group['num_copies']}\n"
+                   f"   Wasted: {group['wasted_mb']:.2f} MB\n"
+                   f"   Files:")
             for j, file in enumerate(group['files'], 1):
                 created = file.get('createdTime', 'Unknown')[:10]
-                report.append(f"     {j}. ID: {file['id']} (Created: {created})")
-            report.append("")
+                yield f"     {j}. ID: {file['id']} (Created: {created})"
+            yield ""
         
-        report.append("=" * 70)
+        yield "=" * 70
+    
+    def generate_report(self, stats: Dict, top_n: int = 20) -> str:
+        """
+        Generate a human-readable report of duplicates.
         
-        return "\n".join(report)
+        Args:
+            stats: Statistics from calculate_wasted_space()
+            top_n: Number of top duplicates to show
+        
+        Returns:
+            Formatted report string
+        """
+        return "\n".join(self.iter_report_lines(stats, top_n))
+    
+    def save_report(self, stats: Dict, report_file: str, top_n: int = 20):
+        """
+        Write the report straight to disk without building it in memory.
+        
+        Args:
+            stats: Statistics from calculate_wasted_space()
+            report_file: Destination path
+            top_n: Number of top duplicates to show
+        """
+        with open(report_file, 'wb', buffering=REPORT_BUFFER_SIZE) as f:
+            lines = self.iter_report_lines(stats, top_n)
+            f.write(next(lines).encode('utf-8'))
+            for line in lines:
+                f.write(b"\n")
+                f.write(line.encode('utf-8'))
 
 
 # CLI Test
@@ -4,69 +4,194 @@ Uses perceptual hashing to find visually similar images
 """
 import logging
 import io
+import multiprocessing
 import os
-from typing import List, Dict, Set, Tuple
+import threading
+from typing import List, Dict, Set, Tuple, Optional, Iterator
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice
+from operator import itemgetter
 from pathlib import Path
+import numpy as np
 from PIL import Image
-import imagehash
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaIoBaseDownload
-from auth import get_credentials
-from config import IMAGE_MIMETYPES, SIMILARITY_THRESHOLD, DUPLICATES_DUMP_DIR
+from auth import get_drive_service
+from result_cache import disk_memo, digest_pairs
+from drive_batch import SKIP_REASONS, batch_dump_and_delete
+from hash_cache import HashCache
+from config import (IMAGE_MIMETYPES, SIMILARITY_THRESHOLD, DUPLICATES_DUMP_DIR, REPORT_BUFFER_SIZE,
+                    HASH_IO_WORKERS, DRIVE_LIST_PAGE_SIZE, DRIVE_IMAGE_LIST_FIELDS, DRIVE_BATCH_SIZE, DUMP_WORKERS,
+                    DRIVE_IMAGE_DUMP_FIELDS, MIN_IMAGE_SIZE_KB)
 from tqdm import tqdm
 
 logging.basicConfig(level=logging.ERROR)
 logger = logging.getLogger(__name__)
 
+HASH_SIZE = 8  # 8 rows of 8 column differences -> 64-bit difference hash
+DRAFT_SIZE = HASH_SIZE * 8  # Smallest decode size requested from the JPEG decoder
+HASH_BATCH_SIZE = 256  # Images hashed per vectorized pass
+# Fresh decode processes: forking while download threads run can deadlock
+_DECODE_CONTEXT = multiprocessing.get_context(
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn')
+
+
+# SWAR popcount masks (NumPy 1.x has no bitwise_count)
+_M1 = np.uint64(0x5555555555555555)
+_M2 = np.uint64(0x3333333333333333)
+_M4 = np.uint64(0x0F0F0F0F0F0F0F0F)
+_H01 = np.uint64(0x0101010101010101)
+
+
+def hamming_distances(codes: np.ndarray, query: np.uint64) -> np.ndarray:
+    """
+    Hamming distance from one 64-bit hash to many.
+    
+    Args:
+        codes: uint64 array of hashes
+        query: Hash to compare against
+    
+    Returns:
+        Array of differing bit counts, one per entry of codes
+    """
+    # Count bits in 2-, 4-, then 8-bit fields, and sum the bytes with one multiply
+    x = codes ^ query
+    x = x - ((x >> np.uint64(1)) & _M1)
+    x = (x & _M2) + ((x >> np.uint64(2)) & _M2)
+    x = (x + (x >> np.uint64(4))) & _M4
+    return (x * _H01) >> np.uint64(56)
+
+
+class MultiIndexHash:
+    """
+    Multi-index hashing over 64-bit hashes for Hamming-radius lookups.
+    
+    Each hash is cut into max_distance + 1 bit chunks and bucketed per
+    chunk. Two hashes within max_distance bits can differ in at most
+    max_distance chunks, so they share at least one bucket exactly;
+    only those candidates need a real distance check.
+    """
+    
+    MIN_CHUNK_BITS = 8  # Narrower chunks make buckets too crowded to help
+    
+    def __init__(self, codes: np.ndarray, max_distance: int):
+        """
+        Bucket every hash by each of its chunks.
+        
+        Args:
+            codes: uint64 array of hashes
+            max_distance: Largest Hamming distance that will be looked up
+        """
+        self.codes = codes
+        self.chunks = []
+        parts = max_distance + 1
+        if 64 // parts < self.MIN_CHUNK_BITS:
+            return  # Too wide a radius; candidates() falls back to a full scan
+        
+        shift = 0
+        for k in range(parts):
+            width = 64 // parts + (1 if k < 64 % parts else 0)
+            keys = (codes >> np.uint64(shift)) & np.uint64((1 << width) - 1)
+            order = np.argsort(keys, kind='stable')
+            unique, starts = np.unique(keys[order], return_index=True)
+            ends = np.append(starts[1:], len(order))
+            buckets = {int(key): order[start:end]
+                       for key, start, end in zip(unique.tolist(), starts.tolist(), ends.tolist())}
+            self.chunks.append((keys, buckets))
+            shift += width
+    
+    def candidates(self, i: int) -> np.ndarray:
+        """
+        Indices of hashes that may lie within max_distance of hash i.
+        
+        Args:
+            i: Index of the query hash
+        
+        Returns:
+            Sorted array of candidate indices (always includes i)
+        """
+        if not self.chunks:
+            return np.arange(len(self.codes))
+        return np.unique(np.concatenate([buckets[int(keys[i])] for keys, buckets in self.chunks]))
+
+
+def decode_image_grid(data: bytes) -> Optional[np.ndarray]:
+    """
+    Decode image bytes to the grayscale grid the difference hash is computed on.
+    
+    Module-level so it can run in a worker process.
+    
+    Args:
+        data: Encoded image file contents
+    
+    Returns:
+        (HASH_SIZE, HASH_SIZE + 1) uint8 array or None if error
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            # Let JPEG decode straight to a reduced grayscale image (a no-op for
+            # other formats); DRAFT_SIZE keeps enough pixels for the same grid
+            image.draft("L", (DRAFT_SIZE, DRAFT_SIZE))
+            # Same reduction imagehash.dhash applies (one extra column for the differences)
+            small = image.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS)
+            return np.asarray(small, dtype=np.uint8)
+    except Exception as e:
+        logger.error(f"Error decoding image: {e}")
+        return None
+
 
 class SimilarImageFinder:
     """Find visually similar images using perceptual hashing."""
     
-    def __init__(self, similarity_threshold: float = SIMILARITY_THRESHOLD):
+    def __init__(self, similarity_threshold: float = SIMILARITY_THRESHOLD,
+                 hash_cache: Optional[HashCache] = None):
         """
         Initialize finder.
         
         Args:
             similarity_threshold: 0.0-1.0, higher = stricter (0.95 = 95% similar)
+            hash_cache: Optional persistent cache consulted before re-hashing
         """
-        self.service = build('drive', 'v3', credentials=get_credentials())
         self.similarity_threshold = similarity_threshold
+        self.hash_cache = hash_cache
         self.image_hashes = {}
     
-    def list_all_images(self, page_size: int = 100) -> List[Dict]:
+    @property
+    def service(self):
+        """Drive service for the calling thread, shared with the other finders."""
+        return get_drive_service()
+    
+    def _list_query(self, query: str, page_size: int, fields: str, on_page=None) -> List[Dict]:
         """
-        List all image files in Drive.
+        Page through one files.list query.
         
         Args:
+            query: Drive search query
             page_size: Number of files per page
+            fields: Partial-response field mask
+            on_page: Optional callback receiving each page's file count
         
         Returns:
-            List of image file metadata
+            List of file metadata dictionaries
         """
         files = []
         page_token = None
         
-        # Build query for images you own
-        mime_query = " or ".join([f"mimeType='{mime}'" for mime in IMAGE_MIMETYPES])
-        query = f"trashed=false and ({mime_query}) and 'me' in owners"
-        
-        print("📸 Scanning Google Drive for images...")
-        
         try:
             while True:
                 response = self.service.files().list(
                     q=query,
                     pageSize=page_size,
                     pageToken=page_token,
-                    fields="nextPageToken, files(id, name, mimeType, size, createdTime, modifiedTime, webViewLink)"
+                    fields=fields,
+                    prettyPrint=False  # Compact JSON; responses are already gzipped
                 ).execute()
                 
                 batch = response.get('files', [])
                 files.extend(batch)
-                
-                print(f"   Found {len(files)} images...", end='\r')
+                if on_page:
+                    on_page(len(batch))
                 
                 page_token = response.get('nextPageToken')
                 if not page_token:
@@ -77,63 +202,139 @@ class SimilarImageFinder:
         except Exception as e:
             logger.error(f"Error listing images: {e}")
         
+        return files
+    
+    def list_all_images(self, page_size: int = DRIVE_LIST_PAGE_SIZE) -> List[Dict]:
+        """
+        List all image files in Drive.
+        
+        Each image MIME type is paginated as its own query, concurrently.
+        
+        Args:
+            page_size: Number of files per page
+        
+        Returns:
+            List of image file metadata
+        """
+        fields = DRIVE_IMAGE_LIST_FIELDS
+        
+        print("📸 Scanning Google Drive for images...")
+        
+        lock = threading.Lock()
+        found = [0]
+        
+        def on_page(count):
+            with lock:
+                found[0] += count
+                print(f"   Found {found[0]} images...", end='\r')
+        
+        # One query per image type you own
+        shards = [f"trashed=false and mimeType='{mime}' and 'me' in owners" for mime in IMAGE_MIMETYPES]
+        with ThreadPoolExecutor(max_workers=len(shards)) as executor:
+            files = [
+                file
+                for shard_files in executor.map(lambda q: self._list_query(q, page_size, fields, on_page), shards)
+                for file in shard_files
+            ]
+        
         print(f"\n✅ Total images found: {len(files)}")
         return files
     
-    def download_image_for_hashing(self, file_id: str) -> Image.Image:
+    def download_image_bytes(self, file_id: str) -> Optional[bytes]:
         """
-        Download image from Drive for hash computation.
+        Download raw image bytes from Drive.
         
         Args:
             file_id: Google Drive file ID
         
         Returns:
-            PIL Image object or None if error
+            File contents or None if error
         """
         try:
-            request = self.service.files().get_media(fileId=file_id)
-            
-            # Download to bytes
-            file_bytes = io.BytesIO()
-            downloader = MediaIoBaseDownload(file_bytes, request)
-            
-            done = False
-            while not done:
-                status, done = downloader.next_chunk()
-            
-            # Load as PIL Image
-            file_bytes.seek(0)
-            image = Image.open(file_bytes)
-            return image
+            # Images are small enough for a single GET straight into bytes
+            return self.service.files().get_media(fileId=file_id).execute()
         
         except Exception as e:
             logger.error(f"Error downloading image {file_id}: {e}")
             return None
     
-    def compute_image_hash(self, image: Image.Image) -> str:
+    def iter_prepared_images(self, files: List[Dict], io_workers: int = HASH_IO_WORKERS,
+                             cpu_workers: Optional[int] = None) -> Iterator[Tuple[Dict, Optional[np.ndarray]]]:
         """
-        Compute perceptual hash of image.
+        Download and decode images in a two-stage pipeline.
+        
+        A thread pool downloads image bytes while a process pool decodes
+        them into hashing grids, so network and CPU work overlap. At most
+        io_workers * 4 files are in flight across both stages; each one
+        that finishes makes room for the next download, so neither stage
+        waits for the other to drain and finished downloads never pile up
+        in memory. Decode workers are never forked from this process, whose
+        download threads may hold locks at fork time.
+        
+        Args:
+            files: Image file metadata
+            io_workers: Concurrent downloads
+            cpu_workers: Decode processes (default: CPU count)
+        
+        Yields:
+            (file, grid) pairs in completion order; grid is None on failure
+        """
+        window = io_workers * 4
+        remaining = iter(files)
+        downloads = {}
+        decodes = {}
+        
+        with ThreadPoolExecutor(max_workers=io_workers) as io_pool, \
+                ProcessPoolExecutor(max_workers=cpu_workers or os.cpu_count(),
+                                    mp_context=_DECODE_CONTEXT) as cpu_pool:
+            
+            def refill():
+                for file in islice(remaining, window - len(downloads) - len(decodes)):
+                    downloads[io_pool.submit(self.download_image_bytes, file['id'])] = file
+            
+            refill()
+            while downloads or decodes:
+                done, _ = wait([*downloads, *decodes], return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in downloads:
+                        file = downloads.pop(future)
+                        data = future.result()
+                        if data is None:
+                            yield file, None
+                        else:
+                            decodes[cpu_pool.submit(decode_image_grid, data)] = file
+                    else:
+                        yield decodes.pop(future), future.result()
+                refill()
+    
+    @staticmethod
+    def difference_hashes(grids: np.ndarray) -> List[str]:
+        """
+        Difference-hash a stack of grayscale grids in one vectorized pass.
+        
+        Produces the same hex strings as str(imagehash.dhash(...)).
         
         Args:
-            image: PIL Image object
+            grids: (N, HASH_SIZE, HASH_SIZE + 1) uint8 array
         
         Returns:
-            Hash string
+            List of N hash strings
         """
-        try:
-            # Use average hash (fast and robust)
-            hash_value = imagehash.average_hash(image, hash_size=8)
-            return str(hash_value)
-        except Exception as e:
-            logger.error(f"Error computing hash: {e}")
-            return None
+        bits = grids[:, :, 1:] > grids[:, :, :-1]
+        packed = np.packbits(bits.reshape(len(grids), -1), axis=1)
+        return [row.tobytes().hex() for row in packed]
     
-    def compute_hashes_for_images(self, files: List[Dict]) -> Dict[str, str]:
+    def compute_hashes_for_images(self, files: List[Dict], batch_size: int = HASH_BATCH_SIZE) -> Dict[str, str]:
         """
         Compute perceptual hashes for all images.
         
+        Images go through the download/decode pipeline of
+        iter_prepared_images() and are hashed batch_size at a time with a
+        single vectorized pass.
+        
         Args:
             files: List of image file metadata
+            batch_size: Number of images hashed together
         
         Returns:
             Dictionary mapping file_id to hash
@@ -142,29 +343,70 @@ class SimilarImageFinder:
         
         hashes = {}
         failed = 0
-        
-        pbar = tqdm(files, desc="Hashing images", ncols=80, bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt}')
-        for file in pbar:
-            file_id = file['id']
-            
-            image = self.download_image_for_hashing(file_id)
-            
-            if image:
-                hash_value = self.compute_image_hash(image)
-                if hash_value:
-                    hashes[file_id] = hash_value
-                else:
-                    failed += 1
+        cached = 0
+        
+        grids = np.empty((batch_size, HASH_SIZE, HASH_SIZE + 1), dtype=np.uint8)
+        pending = []  # (file_id, modified_time, size, md5) for each filled row of grids
+        
+        def flush():
+            for (file_id, modified_time, size, md5), hash_value in zip(pending, self.difference_hashes(grids[:len(pending)])):
+                hashes[file_id] = hash_value
+                if self.hash_cache:
+                    self.hash_cache.put(file_id, modified_time, size, md5=md5, phash=hash_value)
+            pending.clear()
+        
+        # Tiny images (icons, thumbnails) can't free meaningful space; don't download them at all
+        min_bytes = MIN_IMAGE_SIZE_KB * 1024
+        candidates = [f for f in files if int(f.get('size', 0)) >= min_bytes]
+        skipped = len(files) - len(candidates)
+        
+        # Unchanged since the last run, or same content as a file already hashed - reuse the stored hash
+        to_hash = []
+        for file in candidates:
+            phash = None
+            if self.hash_cache:
+                modified_time, size, md5 = file.get('modifiedTime'), int(file.get('size', 0)), file.get('md5Checksum')
+                entry = self.hash_cache.get(file['id'], modified_time, size)
+                phash = entry and entry['phash']
+                if not phash and md5:
+                    phash = self.hash_cache.get_phash_by_md5(md5)
+                    if phash:
+                        self.hash_cache.put(file['id'], modified_time, size, md5=md5, phash=phash)
+            if phash:
+                hashes[file['id']] = phash
+                cached += 1
             else:
+                to_hash.append(file)
+        
+        pbar = tqdm(total=len(to_hash), desc="Hashing images", ncols=80, bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt}')
+        for file, grid in self.iter_prepared_images(to_hash):
+            pbar.update(1)
+            if grid is None:
                 failed += 1
+                continue
+            
+            grids[len(pending)] = grid
+            pending.append((file['id'], file.get('modifiedTime'), int(file.get('size', 0)), file.get('md5Checksum')))
+            if len(pending) == batch_size:
+                flush()
+        
+        if pending:
+            flush()
         
         pbar.close()
-        print(f"✅ Hashed {len(hashes)}/{len(files)} images")
+        if self.hash_cache:
+            self.hash_cache.commit()
+        print(f"✅ Hashed {len(hashes)}/{len(candidates)} images")
+        if cached:
+            print(f"   {cached} reused from hash cache")
+        if skipped:
+            print(f"   {skipped} images under {MIN_IMAGE_SIZE_KB} KB skipped")
         if failed:
             print(f"⚠️  Failed to hash {failed} images")
         
         return hashes
     
+    @disk_memo(key=lambda self, files, hashes: digest_pairs(hashes.items(), self.similarity_threshold))
     def find_similar_images(self, files: List[Dict], hashes: Dict[str, str]) -> Dict[str, List[Dict]]:
         """
         Find groups of similar images.
@@ -180,36 +422,36 @@ class SimilarImageFinder:
         
         file_lookup = {f['id']: f for f in files}
         similar_groups = defaultdict(list)
-        processed = set()
         
         file_ids = list(hashes.keys())
+        codes = np.array([int(hashes[file_id], 16) for file_id in file_ids], dtype=np.uint64)
+        processed = np.zeros(len(file_ids), dtype=bool)
+        max_difference = 64
+        
+        # Largest bit difference that still meets the threshold, evaluated exactly as before
+        max_distance = max((d for d in range(max_difference + 1)
+                            if 1.0 - (d / max_difference) >= self.similarity_threshold), default=-1)
+        index = MultiIndexHash(codes, max(max_distance, 0))
         
         pbar = tqdm(file_ids, desc="Comparing", ncols=80, bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt}')
         for i, file_id_1 in enumerate(pbar):
-            if file_id_1 in processed:
+            if processed[i]:
                 continue
             
-            hash_1 = imagehash.hex_to_hash(hashes[file_id_1])
-            group = [file_lookup[file_id_1]]
-            processed.add(file_id_1)
+            processed[i] = True
             
-            for file_id_2 in file_ids[i+1:]:
-                if file_id_2 in processed:
-                    continue
-                
-                hash_2 = imagehash.hex_to_hash(hashes[file_id_2])
-                
-                # Calculate similarity (0 = identical, higher = more different)
-                difference = hash_1 - hash_2
-                max_difference = 64
-                similarity = 1.0 - (difference / max_difference)
-                
-                if similarity >= self.similarity_threshold:
-                    group.append(file_lookup[file_id_2])
-                    processed.add(file_id_2)
+            # Only later, unclaimed images sharing a chunk can be close enough
+            candidates = index.candidates(i)
+            candidates = candidates[candidates > i]
+            candidates = candidates[~processed[candidates]]
             
-            if len(group) > 1:
-                similar_groups[file_id_1] = group
+            # 0 = identical, higher = more different
+            difference = hamming_distances(codes[candidates], codes[i])
+            matches = candidates[difference <= max_distance]
+            
+            if len(matches):
+                processed[matches] = True
+                similar_groups[file_id_1] = [file_lookup[file_id_1]] + [file_lookup[file_ids[j]] for j in matches]
         
         pbar.close()
         print(f"✅ Found {len(similar_groups)} groups of similar images")
@@ -223,9 +465,11 @@ class SimilarImageFinder:
         groups_info = []
         
         for group_id, files in similar_groups.items():
-            total_group_size = sum(int(f.get('size', 0)) for f in files)
-            files_sorted = sorted(files, key=lambda x: int(x.get('size', 0)), reverse=True)
-            keeper_size = int(files_sorted[0].get('size', 0))
+            # Parse each file's size once; Drive returns it as a string
+            sized = sorted(((int(f.get('size', 0)), f) for f in files), key=itemgetter(0), reverse=True)
+            files_sorted = [f for _, f in sized]
+            total_group_size = sum(size for size, _ in sized)
+            keeper_size = sized[0][0]
             wasted_size = total_group_size - keeper_size
             
             total_wasted_bytes += wasted_size
@@ -239,7 +483,7 @@ class SimilarImageFinder:
                 'keeper_size_mb': keeper_size / (1024 * 1024),
                 'wasted_mb': wasted_size / (1024 * 1024),
                 'files': files_sorted,
-                'hash': list(similar_groups.keys())[list(similar_groups.values()).index(files)]
+                'hash': group_id
             })
         
         groups_info.sort(key=lambda x: x['wasted_mb'], reverse=True)
@@ -277,16 +521,16 @@ class SimilarImageFinder:
         except Exception as e:
             return False
     
-    def dump_and_delete_similar(self, similar_group: Dict, keep_index: int = 0) -> Dict:
+    def _download_group(self, similar_group: Dict, keep_index: int = 0) -> Dict:
         """
-        Download similar images locally, then DELETE from Drive.
+        Download every non-kept image of a similar group into its dump folder.
         
         Args:
             similar_group: Group of similar images
-            keep_index: Index of file to keep (default: 0 = largest/best quality)
+            keep_index: Index of file to keep in Drive
         
         Returns:
-            Results of dump+delete operation
+            Partial results: dump folder, downloaded and failed files
         """
         files = similar_group['files']
         keeper = files[keep_index]
@@ -294,12 +538,10 @@ class SimilarImageFinder:
         # Create subfolder for this similar group
         group_name = keeper['name'].split('.')[0][:30]  # Use keeper's name
         dump_folder = DUPLICATES_DUMP_DIR / f"similar_{group_name}"
-        dump_folder.mkdir(exist_ok=True)
+        dump_folder.mkdir(parents=True, exist_ok=True)
         
         downloaded = []
-        deleted_from_drive = []
         failed = []
-        skipped_no_permission = []
         
         for i, file in enumerate(files):
             if i == keep_index:
@@ -324,16 +566,6 @@ class SimilarImageFinder:
                     'local_path': str(local_path),
                     'created': file.get('createdTime', 'Unknown')[:10]
                 })
-                
-                # Delete from Drive
-                if self.delete_file(file_id):
-                    deleted_from_drive.append(file_id)
-                else:
-                    skipped_no_permission.append({
-                        'id': file_id,
-                        'name': file_name,
-                        'reason': 'no_permission'
-                    })
             else:
                 failed.append({
                     'id': file_id,
@@ -341,37 +573,74 @@ class SimilarImageFinder:
                     'reason': 'download_failed'
                 })
         
+        return {
+            'dump_folder': dump_folder,
+            'downloaded': downloaded,
+            'failed': failed
+        }
+    
+    def _finish_group(self, similar_group: Dict, keep_index: int, partial: Dict,
+                      deleted_from_drive: List[str], skipped_no_permission: List[Dict]) -> Dict:
+        """
+        Write the group's README and assemble its dump+delete results.
+        
+        Args:
+            similar_group: Group of similar images
+            keep_index: Index of file kept in Drive
+            partial: Output of _download_group()
+            deleted_from_drive: IDs deleted from Drive
+            skipped_no_permission: Files that could not be deleted
+        
+        Returns:
+            Results of dump+delete operation
+        """
+        files = similar_group['files']
+        keeper = files[keep_index]
+        dump_folder = partial['dump_folder']
+        downloaded = partial['downloaded']
+        failed = partial['failed']
+        skip_reasons = {s['id']: s['reason'] for s in skipped_no_permission}
+        
         # Create README
         readme_path = dump_folder / 'README.txt'
+        deleted_ids = set(deleted_from_drive)
+        
+        parts = [
+            f"Similar Images Group: {keeper['name']}\n",
+            f"Similarity Threshold: {self.similarity_threshold * 100:.0f}%\n",
+            f"Total Similar Images: {len(files)}\n",
+            f"Space Recovered: {similar_group['wasted_mb']:.2f} MB\n\n",
+            f"Processed: {len(files)} files\n",
+            f"Downloaded: {len(downloaded)} files\n",
+            f"Deleted from Drive: {len(deleted_from_drive)} files\n",
+            f"Kept in Drive: 1 file (best quality)\n",
+            f"Skipped (no permission): {list(skip_reasons.values()).count('no_permission')} files\n",
+            f"Skipped (delete failed): {list(skip_reasons.values()).count('delete_failed')} files\n",
+            f"Failed: {len(failed)} files\n\n",
+            "=" * 70 + "\n",
+            "Files:\n",
+            "=" * 70 + "\n\n",
+        ]
+        for i, file in enumerate(files, 1):
+            if i-1 == keep_index:
+                status = "✅ KEPT IN DRIVE (Best Quality)"
+            elif file['id'] in deleted_ids:
+                status = "🗑️  DOWNLOADED & DELETED FROM DRIVE"
+            elif file['id'] in skip_reasons:
+                status = f"⚠️  SKIPPED ({SKIP_REASONS[skip_reasons[file['id']]]})"
+            else:
+                status = "❌ FAILED"
+            
+            parts.append(
+                f"{i}. {file['name']} ({status})\n"
+                f"   ID: {file['id']}\n"
+                f"   Size: {int(file.get('size', 0)) / (1024 * 1024):.2f} MB\n"
+                f"   Created: {file.get('createdTime', 'Unknown')[:10]}\n"
+                f"   Link: {file.get('webViewLink', 'N/A')}\n\n"
+            )
+        
         with open(readme_path, 'w', encoding='utf-8') as f:
-            f.write(f"Similar Images Group: {keeper['name']}\n")
-            f.write(f"Similarity Threshold: {self.similarity_threshold * 100:.0f}%\n")
-            f.write(f"Total Similar Images: {len(files)}\n")
-            f.write(f"Space Recovered: {similar_group['wasted_mb']:.2f} MB\n\n")
-            f.write(f"Processed: {len(files)} files\n")
-            f.write(f"Downloaded: {len(downloaded)} files\n")
-            f.write(f"Deleted from Drive: {len(deleted_from_drive)} files\n")
-            f.write(f"Kept in Drive: 1 file (best quality)\n")
-            f.write(f"Skipped (no permission): {len(skipped_no_permission)} files\n")
-            f.write(f"Failed: {len(failed)} files\n\n")
-            f.write("=" * 70 + "\n")
-            f.write("Files:\n")
-            f.write("=" * 70 + "\n\n")
-            for i, file in enumerate(files, 1):
-                if i-1 == keep_index:
-                    status = "✅ KEPT IN DRIVE (Best Quality)"
-                elif file['id'] in deleted_from_drive:
-                    status = "🗑️  DOWNLOADED & DELETED FROM DRIVE"
-                elif any(s['id'] == file['id'] for s in skipped_no_permission):
-                    status = "⚠️  SKIPPED (No permission)"
-                else:
-                    status = "❌ FAILED"
-                
-                f.write(f"{i}. {file['name']} ({status})\n")
-                f.write(f"   ID: {file['id']}\n")
-                f.write(f"   Size: {int(file.get('size', 0)) / (1024 * 1024):.2f} MB\n")
-                f.write(f"   Created: {file.get('createdTime', 'Unknown')[:10]}\n")
-                f.write(f"   Link: {file.get('webViewLink', 'N/A')}\n\n")
+            f.write("".join(parts))
         
         return {
             'downloaded': downloaded,
@@ -379,42 +648,142 @@ class SimilarImageFinder:
             'skipped_no_permission': skipped_no_permission,
             'failed': failed,
             'dump_folder': str(dump_folder),
-            'space_freed_bytes': sum(d['size'] for d in downloaded if d['id'] in deleted_from_drive),
-            'space_freed_mb': sum(d['size'] for d in downloaded if d['id'] in deleted_from_drive) / (1024 * 1024)
+            'space_freed_bytes': sum(d['size'] for d in downloaded if d['id'] in deleted_ids),
+            'space_freed_mb': sum(d['size'] for d in downloaded if d['id'] in deleted_ids) / (1024 * 1024)
         }
     
-    def generate_report(self, stats: Dict, top_n: int = 20) -> str:
-        """Generate human-readable report."""
-        report = []
-        report.append("=" * 70)
-        report.append("📸 GOOGLE DRIVE SIMILAR IMAGE REPORT")
-        report.append("=" * 70)
-        report.append("")
-        report.append("📈 SUMMARY")
-        report.append(f"   Total similar files: {stats['total_similar_files']:,}")
-        report.append(f"   Similar groups: {stats['total_groups']:,}")
-        report.append(f"   Wasted space: {stats['total_wasted_gb']:.2f} GB ({stats['total_wasted_mb']:.1f} MB)")
-        report.append(f"   Similarity threshold: {self.similarity_threshold * 100:.0f}%")
-        report.append("")
-        report.append(f"🔝 TOP {top_n} SIMILAR IMAGE GROUPS")
-        report.append("-" * 70)
+    def dump_and_delete_similar(self, similar_group: Dict, keep_index: int = 0) -> Dict:
+        """
+        Download similar images locally, then DELETE from Drive.
+        
+        Args:
+            similar_group: Group of similar images
+            keep_index: Index of file to keep (default: 0 = largest/best quality)
+        
+        Returns:
+            Results of dump+delete operation
+        """
+        # A one-group batch: the group's deletes share batch requests instead of one call each
+        return next(self.batch_dump_and_delete_similar([similar_group], keep_index))
+    
+    def batch_dump_and_delete_similar(self, similar_groups: List[Dict], keep_index: int = 0,
+                                      batch_size: int = DRIVE_BATCH_SIZE,
+                                      workers: int = DUMP_WORKERS) -> Iterator[Dict]:
+        """
+        Dump and delete many similar groups, batching the Drive deletions.
+        
+        Groups are handled in chunks of about batch_size files: every non-kept
+        image in the chunk is downloaded concurrently, then the downloaded
+        images are deleted with one batch request per batch_size files.
+        
+        IMPORTANT: This DELETES files from Drive after downloading!
+        
+        Args:
+            similar_groups: Groups from calculate_wasted_space()
+            keep_index: Index of file to keep in each group
+            batch_size: Deletes per batch request (Drive allows at most 100)
+            workers: Groups downloaded in parallel
+        
+        Yields:
+            Results of dump+delete operation for each group, as in
+            dump_and_delete_similar()
+        """
+        return batch_dump_and_delete(
+            similar_groups,
+            lambda group: self._download_group(group, keep_index),
+            lambda group, partial, deleted, skipped: self._finish_group(group, keep_index, partial,
+                                                                        deleted, skipped),
+            batch_size, workers,
+            prepare_chunk=lambda chunk: self._fetch_dump_details(
+                [f for group in chunk for f in group['files']], batch_size))
+    
+    def _fetch_dump_details(self, files: List[Dict], batch_size: int = DRIVE_BATCH_SIZE):
+        """
+        Fill in the metadata dump READMEs need but the listing leaves out.
+        
+        Only images in similar groups are ever dumped, so these fields are
+        fetched for them alone, batch_size files().get calls per request.
+        
+        Args:
+            files: File metadata dictionaries, updated in place
+            batch_size: Gets per batch request (Drive allows at most 100)
+        """
+        missing = [f for f in files if 'webViewLink' not in f]
+        by_id = {f['id']: f for f in missing}
+        
+        def callback(request_id, response, exception):
+            if exception is None:
+                by_id[request_id].update(response)
+        
+        for start in range(0, len(missing), batch_size):
+            batch = self.service.new_batch_http_request(callback=callback)
+            for f in missing[start:start + batch_size]:
+                batch.add(self.service.files().get(fileId=f['id'], fields=DRIVE_IMAGE_DUMP_FIELDS),
+                          request_id=f['id'])
+            try:
+                batch.execute()
+            except Exception as e:
+                logger.error(f"Error fetching image details: {e}")
+    
+    def iter_report_lines(self, stats: Dict, top_n: int = 20) -> Iterator[str]:
+        """
+        Yield the lines of the similar image report one at a time.
+        
+        Args:
+            stats: Statistics from calculate_wasted_space()
+            top_n: Number of top entries to show
+        
+        Yields:
+            Report lines (without trailing newlines)
+        """
+        yield "=" * 70
+        yield "📸 GOOGLE DRIVE SIMILAR IMAGE REPORT"
+        yield "=" * 70
+        yield ""
+        yield "📈 SUMMARY"
+        yield f"   Total similar files: {stats['total_similar_files']:,}"
+        yield f"   Similar groups: {stats['total_groups']:,}"
+        yield f"   Wasted space: {stats['total_wasted_gb']:.2f} GB ({stats['total_wasted_mb']:.1f} MB)"
+        yield f"   Similarity threshold: {self.similarity_threshold * 100:.0f}%"
+        yield ""
+        yield f"🔝 TOP {top_n} SIMILAR IMAGE GROUPS"
+        yield "-" * 70
         
         for i, group in enumerate(stats['similar_groups'][:top_n], 1):
             keeper = group['keeper']
-            report.append(f"{i}. {keeper['name']} (KEEP)")
-            report.append(f"   Size: {group['keeper_size_mb']:.2f} MB")
-            report.append(f"   Similar images: {group['num_similar'] - 1}")
-            report.append(f"   Wasted space: {group['wasted_mb']:.2f} MB")
-            report.append(f"   Files:")
-            report.append(f"     ✓ {keeper['name']} (KEEPER - {group['keeper_size_mb']:.2f} MB)")
+            yield f"{i}. {keeper['name']} (KEEP)"
+            yield f"   Size: {group['keeper_size_mb']:.2f} MB"
+            yield f"   Similar images: {group['num_similar'] - 1}"
+            yield f"   Wasted space: {group['wasted_mb']:.2f} MB"
+            yield f"   Files:"
+            yield f"     ✓ {keeper['name']} (KEEPER - {group['keeper_size_mb']:.2f} MB)"
             for similar_file in group['similar_files']:
                 size_mb = int(similar_file.get('size', 0)) / (1024 * 1024)
-                report.append(f"     ✗ {similar_file['name']} ({size_mb:.2f} MB)")
-            report.append("")
+                yield f"     ✗ {similar_file['name']} ({size_mb:.2f} MB)"
+            yield ""
         
-        report.append("=" * 70)
-        return "\n".join(report)
-
+        yield "=" * 70
+    
+    
+    def generate_report(self, stats: Dict, top_n: int = 20) -> str:
+        """Generate human-readable report."""
+        return "\n".join(self.iter_report_lines(stats, top_n))
+    
+    def save_report(self, stats: Dict, report_file: str, top_n: int = 20):
+        """
+        Write the report straight to disk without building it in memory.
+        
+        Args:
+            stats: Statistics from calculate_wasted_space()
+            report_file: Destination path
+            top_n: Number of top entries to show
+        """
+        with open(report_file, 'wb', buffering=REPORT_BUFFER_SIZE) as f:
+            lines = self.iter_report_lines(stats, top_n)
+            f.write(next(lines).encode('utf-8'))
+            for line in lines:
+                f.write(b"\n")
+                f.write(line.encode('utf-8'))
 
 # CLI Test
 if __name__ == "__main__":
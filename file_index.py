@@ -0,0 +1,126 @@
+"""
+Persistent Drive File Index
+Keeps the last Drive listing in SQLite so later scans only fetch changes
+"""
+import json
+import logging
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from config import FILE_INDEX_DB
+
+logger = logging.getLogger(__name__)
+
+
+class FileIndex:
+    """SQLite snapshot of listed Drive files plus the changes() page token."""
+    
+    def __init__(self, db_path: Path = FILE_INDEX_DB):
+        """
+        Open (or create) the index database.
+        
+        Args:
+            db_path: Location of the SQLite file
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "file_id TEXT PRIMARY KEY, "
+            "metadata TEXT)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS state ("
+            "key TEXT PRIMARY KEY, "
+            "value TEXT)"
+        )
+        self._conn.commit()
+    
+    def get_page_token(self) -> Optional[str]:
+        """
+        Return the changes() page token saved with the snapshot.
+        
+        Returns:
+            Page token, or None if no complete snapshot exists yet
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM state WHERE key = 'page_token'"
+            ).fetchone()
+        return row[0] if row else None
+    
+    def all_files(self) -> List[Dict]:
+        """
+        Return every file in the snapshot.
+        
+        Returns:
+            List of file metadata dictionaries
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT metadata FROM files").fetchall()
+        files = [json.loads(row[0]) for row in rows]
+        for file in files:
+            # json.loads makes a fresh string per row; share one per MIME type
+            file['mimeType'] = sys.intern(file.get('mimeType', ''))
+        return files
+    
+    def replace_all(self, files: Iterable[Dict], page_token: str):
+        """
+        Replace the snapshot with a full listing, in one transaction.
+        
+        Args:
+            files: File metadata from a complete listing
+            page_token: Start page token fetched before the listing began
+        """
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM files")
+            self._conn.executemany(
+                "INSERT INTO files (file_id, metadata) VALUES (?, ?)",
+                ((f['id'], json.dumps(f, separators=(',', ':'))) for f in files)
+            )
+            self._set_page_token(page_token)
+    
+    def apply_changes(self, upserts: Iterable[Dict], removals: Iterable[str], page_token: str):
+        """
+        Apply a batch of Drive changes, in one transaction.
+        
+        Args:
+            upserts: New or modified files that belong in the listing
+            removals: IDs of files that left the listing
+            page_token: Token to resume changes() from next time
+        """
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO files (file_id, metadata) VALUES (?, ?)",
+                ((f['id'], json.dumps(f, separators=(',', ':'))) for f in upserts)
+            )
+            self._conn.executemany(
+                "DELETE FROM files WHERE file_id = ?",
+                ((file_id,) for file_id in removals)
+            )
+            self._set_page_token(page_token)
+    
+    def _set_page_token(self, page_token: str):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO state (key, value) VALUES ('page_token', ?)",
+            (page_token,)
+        )
+    
+    def close(self):
+        """Close the database."""
+        with self._lock:
+            self._conn.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            self.close()
+        except sqlite3.Error as e:
+            logger.error(f"Error closing file index: {e}")
@@ -4,32 +4,87 @@ Find and manage large email attachments
 """
 import logging
 import base64
+import heapq
 import os
-from typing import List, Dict, Optional
+import re
+import time
+from typing import List, Dict, Optional, Iterator
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-from auth import get_credentials
-from config import GMAIL_MIN_ATTACHMENT_SIZE_MB, GMAIL_MAX_RESULTS, GMAIL_DUMP_DIR
+from auth import get_gmail_service
+from message_cache import MessageCache
+from config import (GMAIL_MIN_ATTACHMENT_SIZE_MB, GMAIL_MAX_RESULTS, GMAIL_DUMP_DIR, REPORT_BUFFER_SIZE,
+                    GMAIL_BATCH_DELETE_SIZE, GMAIL_BATCH_GET_SIZE, DUMP_WORKERS)
 from tqdm import tqdm
 
 logging.basicConfig(level=logging.ERROR)
 logger = logging.getLogger(__name__)
 
+BATCH_RETRIES = 3  # Follow-up batches for parts that hit 429/5xx (exponential backoff)
+BATCH_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Anything but letters/digits (\w is str.isalnum() plus '_'), spaces, '-' and '_'
+UNSAFE_SUBJECT_CHARS = re.compile(r'[^\w \-]')
+
+# Base64 characters decoded per write (a multiple of 4, so chunks decode independently)
+DECODE_CHUNK_CHARS = 4 * 256 * 1024
+
+# MIME nesting levels covered by the partial-response mask; Gmail's fields
+# syntax has no recursion, so parts deeper than this are not returned and
+# such messages are fetched again without the mask
+PART_DEPTH = 5
+
+
+def _part_fields(depth: int) -> str:
+    """Field mask for a message part and its subparts, depth levels deep."""
+    fields = "filename,mimeType,body(attachmentId,size)"
+    if depth > 1:
+        fields += f",parts({_part_fields(depth - 1)})"
+    return fields
+
+
+# Only what _parse_message reads: no body data, no snippet, no label IDs
+MESSAGE_FIELDS = f"id,payload(headers(name,value),{_part_fields(PART_DEPTH)})"
+
+# Container parts whose children the mask would cut off at PART_DEPTH
+CONTAINER_MIMETYPES = ('multipart/', 'message/')
+
+
+def _mask_truncated(payload: Dict) -> bool:
+    """True if a container part sits at PART_DEPTH, so its subparts were not returned."""
+    level = [payload]
+    for _ in range(PART_DEPTH - 1):
+        level = [child for part in level for child in part.get('parts', ())]
+    return any(part.get('mimeType', '').startswith(CONTAINER_MIMETYPES) for part in level)
+
+
+def _email_size(email: Dict) -> int:
+    """Sort key: total attachment bytes of an email."""
+    return email['total_attachment_size_bytes']
+
 
 class GmailAttachmentScanner:
     """Scan and manage Gmail attachments."""
     
-    def __init__(self, min_size_mb: int = GMAIL_MIN_ATTACHMENT_SIZE_MB):
+    def __init__(self, min_size_mb: int = GMAIL_MIN_ATTACHMENT_SIZE_MB,
+                 message_cache: Optional[MessageCache] = None):
         """
         Initialize scanner.
         
         Args:
             min_size_mb: Minimum attachment size to scan for (in MB)
+            message_cache: Optional persistent cache consulted before fetching message details
         """
-        self.service = build('gmail', 'v1', credentials=get_credentials())
         self.min_size_bytes = min_size_mb * 1024 * 1024
         self.min_size_mb = min_size_mb
+        self.message_cache = message_cache
+    
+    @property
+    def service(self):
+        """Gmail service for the calling thread, shared with the other finders."""
+        return get_gmail_service()
     
     def search_emails_with_large_attachments(self, max_results: int = GMAIL_MAX_RESULTS) -> List[Dict]:
         """
@@ -47,41 +102,62 @@ class GmailAttachmentScanner:
         query = f"has:attachment larger:{self.min_size_mb}M"
         
         emails_with_attachments = []
-        page_token = None
+        failed = []
+        cached_count = 0
+        
+        def list_page(page_token):
+            return self.service.users().messages().list(
+                userId='me',
+                q=query,
+                maxResults=min(500, max_results),
+                pageToken=page_token
+            ).execute()
         
         try:
-            while True:
-                results = self.service.users().messages().list(
-                    userId='me',
-                    q=query,
-                    maxResults=min(500, max_results),
-                    pageToken=page_token
-                ).execute()
-                
-                messages = results.get('messages', [])
-                
-                if not messages:
-                    break
-                
-                print(f"   Found {len(emails_with_attachments) + len(messages)} emails...", end='\r')
-                
-                # Get full message details with progress bar
-                pbar = tqdm(messages, desc="Loading details", ncols=80, 
-                           bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt}', leave=False)
-                
-                for message in pbar:
-                    msg_id = message['id']
-                    msg_data = self.get_message_details(msg_id)
+            with ThreadPoolExecutor(max_workers=1) as lister:
+                results = list_page(None)
+                while True:
+                    messages = results.get('messages', [])
                     
-                    if msg_data and msg_data.get('attachments'):
-                        emails_with_attachments.append(msg_data)
-                
-                pbar.close()
-                
-                page_token = results.get('nextPageToken')
-                
-                if not page_token or len(emails_with_attachments) >= max_results:
-                    break
+                    if not messages:
+                        break
+                    
+                    # List the next page of IDs while this page's details load
+                    page_token = results.get('nextPageToken')
+                    next_page = lister.submit(list_page, page_token) if page_token else None
+                    
+                    print(f"   Found {len(emails_with_attachments) + len(messages)} emails...", end='\r')
+                    
+                    # Get full message details, one batch request per GMAIL_BATCH_GET_SIZE messages
+                    pbar = tqdm(total=len(messages), desc="Loading details", ncols=80,
+                               bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt}', leave=False)
+                    
+                    for start in range(0, len(messages), GMAIL_BATCH_GET_SIZE):
+                        chunk_ids = [m['id'] for m in messages[start:start + GMAIL_BATCH_GET_SIZE]]
+                        details = {}
+                        if self.message_cache:
+                            for msg_id in chunk_ids:
+                                entry = self.message_cache.get(msg_id, self.min_size_bytes)
+                                if entry is not MessageCache.MISSING:
+                                    details[msg_id] = entry
+                            cached_count += len(details)
+                        
+                        missing = [msg_id for msg_id in chunk_ids if msg_id not in details]
+                        if missing:
+                            fetched = self._get_message_batch(missing, failed)
+                            if self.message_cache:
+                                self.message_cache.put_many(fetched.items(), self.min_size_bytes)
+                            details.update(fetched)
+                        
+                        emails_with_attachments.extend(details[msg_id] for msg_id in chunk_ids
+                                                       if details.get(msg_id))
+                        pbar.update(len(chunk_ids))
+                    
+                    pbar.close()
+                    
+                    if not next_page or len(emails_with_attachments) >= max_results:
+                        break
+                    results = next_page.result()
         
         except HttpError as e:
             logger.error(f"HTTP Error searching emails: {e}")
@@ -89,6 +165,10 @@ class GmailAttachmentScanner:
             logger.error(f"Error searching emails: {e}")
         
         print(f"\n✅ Found {len(emails_with_attachments)} emails with large attachments")
+        if failed:
+            print(f"⚠️  Could not load {len(failed)} messages")
+        if cached_count:
+            print(f"   {cached_count} messages loaded from cache")
         return emails_with_attachments
     
     def get_message_details(self, msg_id: str) -> Optional[Dict]:
@@ -105,24 +185,128 @@ class GmailAttachmentScanner:
             message = self.service.users().messages().get(
                 userId='me',
                 id=msg_id,
-                format='full'
+                format='full',
+                fields=MESSAGE_FIELDS
             ).execute()
+            if _mask_truncated(message.get('payload', {})):
+                message = self._get_unmasked_message(msg_id)
+            return self._parse_message(message)
+        
+        except Exception as e:
+            logger.error(f"Error getting message {msg_id}: {e}")
+            return None
+    
+    def _get_message_batch(self, msg_ids: List[str],
+                           failed: Optional[List[str]] = None) -> Dict[str, Optional[Dict]]:
+        """
+        Fetch and parse several messages with one batch request.
+        
+        Parts that fail with 429 or 5xx (typically per-user rate limits) are
+        sent again in a smaller follow-up batch after an exponential backoff,
+        up to BATCH_RETRIES times.
+        
+        Args:
+            msg_ids: Gmail message IDs (at most 100, Gmail's batch limit)
+            failed: Optional list the IDs of messages that could not be loaded are appended to
+        
+        Returns:
+            Mapping of each successfully fetched message ID to its details,
+            or None when the message has no large attachments
+        """
+        parsed = {}
+        done = set()
+        truncated = []
+        
+        def callback(request_id, response, exception):
+            if exception is not None:
+                status = getattr(getattr(exception, 'resp', None), 'status', None)
+                if status in BATCH_RETRY_STATUSES:
+                    return  # Left pending for the next follow-up batch
+                logger.error(f"Error getting message {request_id}: {exception}")
+                if failed is not None:
+                    failed.append(request_id)
+            elif _mask_truncated(response.get('payload', {})):
+                truncated.append(request_id)
+            else:
+                parsed[request_id] = self._parse_message(response)
+            done.add(request_id)
+        
+        pending = list(msg_ids)
+        for attempt in range(BATCH_RETRIES + 1):
+            if attempt:
+                time.sleep(2 ** (attempt - 1))
             
+            batch = self.service.new_batch_http_request(callback=callback)
+            for msg_id in pending:
+                batch.add(self.service.users().messages().get(userId='me', id=msg_id, format='full',
+                                                               fields=MESSAGE_FIELDS),
+                          request_id=msg_id)
+            try:
+                batch.execute()
+            except Exception as e:
+                logger.error(f"Error getting messages: {e}")
+            
+            pending = [msg_id for msg_id in pending if msg_id not in done]
+            if not pending:
+                break
+        
+        if pending:
+            logger.error(f"Giving up on {len(pending)} messages after {BATCH_RETRIES} retries")
+            if failed is not None:
+                failed.extend(pending)
+        
+        for msg_id in truncated:
+            try:
+                parsed[msg_id] = self._parse_message(self._get_unmasked_message(msg_id))
+            except Exception as e:
+                logger.error(f"Error getting message {msg_id}: {e}")
+                if failed is not None:
+                    failed.append(msg_id)
+        
+        return parsed
+    
+    def _get_unmasked_message(self, msg_id: str) -> Dict:
+        """
+        Fetch a message without the fields mask.
+        
+        Used when its MIME tree is nested deeper than PART_DEPTH (e.g. a
+        forwarded message inside mixed/related/alternative parts), where the
+        masked response would silently drop the deeper attachments.
+        
+        Args:
+            msg_id: Gmail message ID
+        
+        Returns:
+            Full-format message resource
+        """
+        logger.info(f"Message {msg_id} nests parts deeper than {PART_DEPTH} levels, fetching it unmasked")
+        return self.service.users().messages().get(userId='me', id=msg_id, format='full').execute()
+    
+    def _parse_message(self, message: Dict) -> Optional[Dict]:
+        """
+        Turn a full-format message into the scanner's email record.
+        
+        Args:
+            message: Response of users.messages.get(format='full')
+        
+        Returns:
+            Dictionary with message details and attachments, or None if it
+            has no attachment of at least min_size_mb
+        """
+        msg_id = message['id']
+        try:
             # Extract headers
             headers = message.get('payload', {}).get('headers', [])
-            subject = next((h['value'] for h in headers if h['name'].lower() == 'subject'), 'No Subject')
-            sender = next((h['value'] for h in headers if h['name'].lower() == 'from'), 'Unknown')
-            date = next((h['value'] for h in headers if h['name'].lower() == 'date'), 'Unknown')
+            # One pass, lowercased names; reversed so the first occurrence wins as before
+            by_name = {h['name'].lower(): h['value'] for h in reversed(headers)}
+            subject = by_name.get('subject', 'No Subject')
+            sender = by_name.get('from', 'Unknown')
+            date = by_name.get('date', 'Unknown')
             
-            # Extract attachments
-            attachments = []
-            self._extract_attachments(message.get('payload', {}), attachments, msg_id)
-            
-            # Filter by size
-            large_attachments = [
-                att for att in attachments 
-                if att['size'] >= self.min_size_bytes
-            ]
+            # Extract only the attachments large enough to report
+            large_attachments = []
+            self._extract_attachments(message.get('payload', {}), large_attachments, msg_id,
+                                      self.min_size_bytes)
             
             if not large_attachments:
                 return None
@@ -141,67 +325,83 @@ class GmailAttachmentScanner:
             }
         
         except Exception as e:
-            logger.error(f"Error getting message {msg_id}: {e}")
+            logger.error(f"Error parsing message {msg_id}: {e}")
             return None
     
-    def _extract_attachments(self, payload: Dict, attachments: List[Dict], msg_id: str):
+    @staticmethod
+    def _extract_attachments(payload: Dict, attachments: List[Dict], msg_id: str, min_size: int = 0):
         """
-        Recursively extract attachments from message payload.
+        Extract attachments from a message payload and all its subparts.
+        
+        Walks the MIME tree with an explicit stack (no recursion limit),
+        visiting parts in the same order a recursive walk would: every
+        subpart before the part that contains it.
         
         Args:
             payload: Message payload
             attachments: List to append attachments to
             msg_id: Message ID
+            min_size: Smallest attachment (bytes) to collect; smaller ones are skipped
         """
-        if 'parts' in payload:
-            for part in payload['parts']:
-                self._extract_attachments(part, attachments, msg_id)
-        
-        if payload.get('filename'):
-            attachment_id = payload.get('body', {}).get('attachmentId')
-            size = payload.get('body', {}).get('size', 0)
-            mime_type = payload.get('mimeType', 'unknown')
+        stack = [(payload, False)]
+        while stack:
+            part, expanded = stack.pop()
+            parts = part.get('parts')
+            if parts and not expanded:
+                stack.append((part, True))
+                stack.extend((child, False) for child in reversed(parts))
+                continue
             
-            if attachment_id and size > 0:
-                attachments.append({
-                    'id': attachment_id,
-                    'filename': payload['filename'],
-                    'mime_type': mime_type,
-                    'size': size,
-                    'size_mb': size / (1024 * 1024),
-                    'message_id': msg_id
-                })
+            filename = part.get('filename')
+            if filename:
+                body = part.get('body', {})
+                attachment_id = body.get('attachmentId')
+                size = body.get('size', 0)
+                
+                if attachment_id and size > 0 and size >= min_size:
+                    attachments.append({
+                        'id': attachment_id,
+                        'filename': filename,
+                        'mime_type': part.get('mimeType', 'unknown'),
+                        'size': size,
+                        'size_mb': size / (1024 * 1024),
+                        'message_id': msg_id
+                    })
     
-    def calculate_stats(self, emails: List[Dict]) -> Dict:
+    def calculate_stats(self, emails: List[Dict], top_n: int = 20) -> Dict:
         """
         Calculate statistics about email attachments.
         
         Args:
             emails: List of email metadata
+            top_n: Number of largest emails to pick out as 'top_emails'
         
         Returns:
-            Statistics dictionary
+            Statistics dictionary; 'emails' is the unsorted input and
+            'top_emails' the top_n largest, biggest first
         """
         total_size = sum(email['total_attachment_size_bytes'] for email in emails)
         total_attachments = sum(email['num_attachments'] for email in emails)
         
-        # Group by file type
-        by_type = {}
+        # Group by file type: accumulate [count, bytes], derive MB once at the end
+        totals = defaultdict(lambda: [0, 0])
         for email in emails:
             for att in email['attachments']:
-                mime_type = att['mime_type']
-                if mime_type not in by_type:
-                    by_type[mime_type] = {
-                        'count': 0,
-                        'size_bytes': 0,
-                        'size_mb': 0
-                    }
-                by_type[mime_type]['count'] += 1
-                by_type[mime_type]['size_bytes'] += att['size']
-                by_type[mime_type]['size_mb'] += att['size_mb']
-        
-        # Sort emails by size
-        emails_sorted = sorted(emails, key=lambda x: x['total_attachment_size_bytes'], reverse=True)
+                entry = totals[att['mime_type']]
+                entry[0] += 1
+                entry[1] += att['size']
+        
+        by_type = {
+            mime_type: {
+                'count': count,
+                'size_bytes': size_bytes,
+                'size_mb': size_bytes / (1024 * 1024)
+            }
+            for mime_type, (count, size_bytes) in totals.items()
+        }
+        
+        # Only the largest few are displayed - no need to sort everything
+        top_emails = heapq.nlargest(top_n, emails, key=_email_size)
         
         return {
             'total_emails': len(emails),
@@ -210,7 +410,8 @@ class GmailAttachmentScanner:
             'total_size_mb': total_size / (1024 * 1024),
             'total_size_gb': total_size / (1024 * 1024 * 1024),
             'by_type': by_type,
-            'emails_sorted': emails_sorted
+            'emails': emails,
+            'top_emails': top_emails
         }
     
     def download_attachment(self, msg_id: str, attachment_id: str, filename: str, destination: Path) -> bool:
@@ -230,13 +431,15 @@ class GmailAttachmentScanner:
             attachment = self.service.users().messages().attachments().get(
                 userId='me',
                 messageId=msg_id,
-                id=attachment_id
+                id=attachment_id,
+                fields='data'
             ).execute()
+            data = attachment['data']
             
-            file_data = base64.urlsafe_b64decode(attachment['data'].encode('UTF-8'))
-            
+            # Decode piecewise so the whole decoded file is never held next to the base64 text
             with open(destination, 'wb') as f:
-                f.write(file_data)
+                for start in range(0, len(data), DECODE_CHUNK_CHARS):
+                    f.write(base64.urlsafe_b64decode(data[start:start + DECODE_CHUNK_CHARS]))
             
             return True
         
@@ -265,59 +468,99 @@ class GmailAttachmentScanner:
             logger.error(f"Error deleting email {msg_id}: {e}")
             return False
     
-    def dump_and_delete_emails(self, email: Dict) -> Dict:
+    def _download_emails(self, emails: List[Dict], executor: ThreadPoolExecutor) -> List[Dict]:
         """
-        Download attachments locally, then DELETE email from Gmail.
+        Download the attachments of several emails into their dump folders (no deletion).
+        
+        Every attachment of every email is submitted to executor at once, so
+        one email with many attachments doesn't hold up the others. Repeated
+        filenames within an email are saved as name_1.ext, name_2.ext, ...
         
         Args:
-            email: Email metadata with attachments
+            emails: Email metadata with attachments
+            executor: Pool the downloads run on
         
         Returns:
-            Results of dump+delete operation
+            One dictionary per email with 'email_folder', 'downloaded' and 'failed'
         """
-        msg_id = email['id']
-        subject = email['subject'][:50]
-        
-        # Create folder for this email
-        safe_subject = "".join(c for c in subject if c.isalnum() or c in (' ', '-', '_')).strip()
-        email_folder = GMAIL_DUMP_DIR / f"{msg_id}_{safe_subject}"
-        email_folder.mkdir(exist_ok=True)
-        
-        downloaded = []
-        failed = []
-        
-        for att in email['attachments']:
-            local_path = email_folder / att['filename']
+        partials = []
+        jobs = []  # (partial, message ID, attachment, local path)
+        for email in emails:
+            subject = email['subject'][:50]
+            
+            # Create folder for this email
+            safe_subject = UNSAFE_SUBJECT_CHARS.sub('', subject).strip()
+            email_folder = GMAIL_DUMP_DIR / f"{email['id']}_{safe_subject}"
+            email_folder.mkdir(parents=True, exist_ok=True)
             
-            if self.download_attachment(msg_id, att['id'], att['filename'], local_path):
-                downloaded.append({
+            partial = {'email_folder': email_folder, 'downloaded': [], 'failed': []}
+            partials.append(partial)
+            local_names = set()
+            for att in email['attachments']:
+                # Same-named attachments run in parallel; give each its own file
+                name_parts = os.path.splitext(att['filename'])
+                local_name = att['filename']
+                copy = 0
+                while local_name in local_names:
+                    copy += 1
+                    local_name = f"{name_parts[0]}_{copy}{name_parts[1]}"
+                local_names.add(local_name)
+                jobs.append((partial, email['id'], att, email_folder / local_name))
+        
+        results = executor.map(lambda job: self.download_attachment(job[1], job[2]['id'], job[2]['filename'], job[3]),
+                               jobs)
+        
+        for (partial, _, att, local_path), ok in zip(jobs, results):
+            if ok:
+                partial['downloaded'].append({
                     'filename': att['filename'],
                     'size': att['size'],
                     'local_path': str(local_path)
                 })
             else:
-                failed.append(att['filename'])
+                partial['failed'].append(att['filename'])
         
-        # Delete email after downloading attachments
-        deleted = self.delete_email(msg_id)
+        return partials
+    
+    def _finish_email(self, email: Dict, partial: Dict, deleted: bool) -> Dict:
+        """
+        Write the dump folder README and build the result of a dump+delete.
+        
+        Args:
+            email: Email metadata with attachments
+            partial: One entry of _download_emails()
+            deleted: Whether the email was moved to trash
+        
+        Returns:
+            Results of dump+delete operation
+        """
+        email_folder = partial['email_folder']
+        downloaded = partial['downloaded']
+        failed = partial['failed']
         
         # Create README
         readme_path = email_folder / 'README.txt'
+        downloaded_names = {d['filename'] for d in downloaded}
+        
+        parts = [
+            f"Email: {email['subject']}\n",
+            f"From: {email['from']}\n",
+            f"Date: {email['date']}\n",
+            f"Total Size: {email['total_attachment_size_mb']:.2f} MB\n",
+            f"Attachments: {len(email['attachments'])}\n",
+            f"Downloaded: {len(downloaded)}\n",
+            f"Failed: {len(failed)}\n",
+            f"Email Deleted: {'Yes' if deleted else 'No'}\n\n",
+            "=" * 70 + "\n",
+            "Attachments:\n",
+            "=" * 70 + "\n\n",
+        ]
+        for att in email['attachments']:
+            status = "✅ Downloaded" if att['filename'] in downloaded_names else "❌ Failed"
+            parts.append(f"- {att['filename']} ({att['size_mb']:.2f} MB) - {status}\n")
+        
         with open(readme_path, 'w', encoding='utf-8') as f:
-            f.write(f"Email: {email['subject']}\n")
-            f.write(f"From: {email['from']}\n")
-            f.write(f"Date: {email['date']}\n")
-            f.write(f"Total Size: {email['total_attachment_size_mb']:.2f} MB\n")
-            f.write(f"Attachments: {len(email['attachments'])}\n")
-            f.write(f"Downloaded: {len(downloaded)}\n")
-            f.write(f"Failed: {len(failed)}\n")
-            f.write(f"Email Deleted: {'Yes' if deleted else 'No'}\n\n")
-            f.write("=" * 70 + "\n")
-            f.write("Attachments:\n")
-            f.write("=" * 70 + "\n\n")
-            for att in email['attachments']:
-                status = "✅ Downloaded" if att['filename'] in [d['filename'] for d in downloaded] else "❌ Failed"
-                f.write(f"- {att['filename']} ({att['size_mb']:.2f} MB) - {status}\n")
+            f.write("".join(parts))
         
         return {
             'downloaded': downloaded,
@@ -327,39 +570,142 @@ class GmailAttachmentScanner:
             'space_freed_mb': email['total_attachment_size_mb'] if deleted else 0
         }
     
-    def generate_report(self, stats: Dict, top_n: int = 20) -> str:
-        """Generate human-readable report."""
-        report = []
-        report.append("=" * 70)
-        report.append("📧 GMAIL ATTACHMENT REPORT")
-        report.append("=" * 70)
-        report.append("")
-        report.append("📈 SUMMARY")
-        report.append(f"   Total emails with attachments: {stats['total_emails']:,}")
-        report.append(f"   Total attachments: {stats['total_attachments']:,}")
-        report.append(f"   Total size: {stats['total_size_gb']:.2f} GB ({stats['total_size_mb']:.1f} MB)")
-        report.append("")
+    def dump_and_delete_emails(self, email: Dict) -> Dict:
+        """
+        Download attachments locally, then DELETE email from Gmail.
+        
+        Args:
+            email: Email metadata with attachments
+        
+        Returns:
+            Results of dump+delete operation
+        """
+        with ThreadPoolExecutor(max_workers=DUMP_WORKERS) as executor:
+            partial, = self._download_emails([email], executor)
+        
+        # Delete email after downloading attachments
+        deleted = self.delete_email(email['id'])
+        
+        return self._finish_email(email, partial, deleted)
+    
+    def batch_trash_emails(self, message_ids: List[str],
+                           batch_size: int = GMAIL_BATCH_DELETE_SIZE) -> Dict[str, bool]:
+        """
+        Move emails to trash with one batchModify call per batch_size messages.
+        
+        Args:
+            message_ids: Message IDs to trash
+            batch_size: Messages per batchModify call (Gmail allows at most 1000)
+        
+        Returns:
+            Dictionary mapping message ID to True if it was trashed
+        """
+        outcomes = {}
+        
+        for start in range(0, len(message_ids), batch_size):
+            chunk = message_ids[start:start + batch_size]
+            try:
+                self.service.users().messages().batchModify(
+                    userId='me',
+                    body={'ids': chunk, 'addLabelIds': ['TRASH']}
+                ).execute()
+                trashed = True
+            except Exception as e:
+                logger.error(f"Batch trash failed: {e}")
+                trashed = False
+            for msg_id in chunk:
+                outcomes[msg_id] = trashed
+        
+        return outcomes
+    
+    def batch_dump_and_delete_emails(self, emails: List[Dict], batch_size: int = GMAIL_BATCH_DELETE_SIZE,
+                                     workers: int = DUMP_WORKERS) -> Iterator[Dict]:
+        """
+        Dump and delete many emails, batching the trash calls.
+        
+        Emails are handled batch_size at a time: their attachments are
+        downloaded concurrently, then the whole chunk is trashed with a
+        single batchModify call.
+        
+        IMPORTANT: This moves emails to trash after downloading!
+        
+        Args:
+            emails: Email metadata with attachments
+            batch_size: Messages per batchModify call (Gmail allows at most 1000)
+            workers: Attachments downloaded in parallel
+        
+        Yields:
+            Results of dump+delete operation for each email, as in
+            dump_and_delete_emails()
+        """
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for start in range(0, len(emails), batch_size):
+                chunk = emails[start:start + batch_size]
+                partials = self._download_emails(chunk, executor)
+                
+                outcomes = self.batch_trash_emails([email['id'] for email in chunk], batch_size)
+                
+                for email, partial in zip(chunk, partials):
+                    yield self._finish_email(email, partial, outcomes[email['id']])
+    
+    def iter_report_lines(self, stats: Dict) -> Iterator[str]:
+        """
+        Yield the lines of the attachment report one at a time.
+        
+        Args:
+            stats: Statistics from calculate_stats()
+        
+        Yields:
+            Report lines (without trailing newlines)
+        """
+        yield "=" * 70
+        yield "📧 GMAIL ATTACHMENT REPORT"
+        yield "=" * 70
+        yield ""
+        yield "📈 SUMMARY"
+        yield f"   Total emails with attachments: {stats['total_emails']:,}"
+        yield f"   Total attachments: {stats['total_attachments']:,}"
+        yield f"   Total size: {stats['total_size_gb']:.2f} GB ({stats['total_size_mb']:.1f} MB)"
+        yield ""
         
         # By type
-        report.append("📁 BY FILE TYPE")
-        report.append("-" * 70)
+        yield "📁 BY FILE TYPE"
+        yield "-" * 70
         for mime_type, data in sorted(stats['by_type'].items(), key=lambda x: x[1]['size_bytes'], reverse=True):
-            report.append(f"{mime_type}")
-            report.append(f"   Count: {data['count']:,} files")
-            report.append(f"   Size: {data['size_mb']:.2f} MB")
-            report.append("")
+            yield f"{mime_type}"
+            yield f"   Count: {data['count']:,} files"
+            yield f"   Size: {data['size_mb']:.2f} MB"
+            yield ""
         
         # Top emails
-        report.append(f"🔝 TOP {top_n} LARGEST EMAILS")
-        report.append("-" * 70)
-        for i, email in enumerate(stats['emails_sorted'][:top_n], 1):
-            report.append(f"{i}. {email['subject'][:60]}")
-            report.append(f"   From: {email['from']}")
-            report.append(f"   Date: {email['date']}")
-            report.append(f"   Attachments: {email['num_attachments']} files ({email['total_attachment_size_mb']:.2f} MB)")
+        yield f"🔝 TOP {len(stats['top_emails'])} LARGEST EMAILS"
+        yield "-" * 70
+        for i, email in enumerate(stats['top_emails'], 1):
+            yield f"{i}. {email['subject'][:60]}"
+            yield f"   From: {email['from']}"
+            yield f"   Date: {email['date']}"
+            yield f"   Attachments: {email['num_attachments']} files ({email['total_attachment_size_mb']:.2f} MB)"
             for att in email['attachments']:
-                report.append(f"     - {att['filename']} ({att['size_mb']:.2f} MB)")
-            report.append("")
+                yield f"     - {att['filename']} ({att['size_mb']:.2f} MB)"
+            yield ""
         
-        report.append("=" * 70)
-        return "\n".join(report)
+        yield "=" * 70
+    
+    def generate_report(self, stats: Dict) -> str:
+        """Generate human-readable report."""
+        return "\n".join(self.iter_report_lines(stats))
+    
+    def save_report(self, stats: Dict, report_file: str):
+        """
+        Write the report straight to disk without building it in memory.
+        
+        Args:
+            stats: Statistics from calculate_stats()
+            report_file: Destination path
+        """
+        with open(report_file, 'wb', buffering=REPORT_BUFFER_SIZE) as f:
+            lines = self.iter_report_lines(stats)
+            f.write(next(lines).encode('utf-8'))
+            for line in lines:
+                f.write(b"\n")
+                f.write(line.encode('utf-8'))
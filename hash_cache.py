@@ -0,0 +1,130 @@
+"""
+Persistent Hash Cache
+Stores per-file hashes in SQLite so unchanged Drive files are not re-hashed
+"""
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+from config import HASH_CACHE_DB
+
+logger = logging.getLogger(__name__)
+
+# Bump when the meaning of a stored hash changes (1: phash is a difference hash)
+SCHEMA_VERSION = 1
+
+
+class HashCache:
+    """SQLite-backed cache of file hashes keyed by Drive file ID."""
+    
+    def __init__(self, db_path: Path = HASH_CACHE_DB):
+        """
+        Open (or create) the cache database.
+        
+        Args:
+            db_path: Location of the SQLite file
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS file_hashes ("
+            "file_id TEXT PRIMARY KEY, "
+            "modified_time TEXT, "
+            "size INTEGER, "
+            "md5 TEXT, "
+            "phash TEXT)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS file_hashes_md5 ON file_hashes (md5)"
+        )
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            # Perceptual hashes from an older algorithm can't be compared with new ones
+            self._conn.execute("UPDATE file_hashes SET phash = NULL")
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._conn.commit()
+    
+    def get(self, file_id: str, modified_time: str, size: int) -> Optional[Dict]:
+        """
+        Look up cached hashes for a file.
+        
+        An entry is only valid while the file's size and modifiedTime match.
+        
+        Args:
+            file_id: Google Drive file ID
+            modified_time: Drive modifiedTime of the file
+            size: File size in bytes
+        
+        Returns:
+            Dictionary with 'md5' and 'phash' (either may be None), or None on miss
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT md5, phash FROM file_hashes "
+                "WHERE file_id = ? AND modified_time = ? AND size = ?",
+                (file_id, modified_time, size)
+            ).fetchone()
+        
+        if row is None:
+            return None
+        return {'md5': row[0], 'phash': row[1]}
+    
+    def get_phash_by_md5(self, md5: str) -> Optional[str]:
+        """
+        Look up a perceptual hash stored for any file with the same content.
+        
+        Args:
+            md5: Drive md5Checksum of the file
+        
+        Returns:
+            Perceptual hash (hex), or None if no file with that MD5 was hashed
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT phash FROM file_hashes "
+                "WHERE md5 = ? AND phash IS NOT NULL LIMIT 1",
+                (md5,)
+            ).fetchone()
+        return row[0] if row else None
+    
+    def put(self, file_id: str, modified_time: str, size: int,
+            md5: Optional[str] = None, phash: Optional[str] = None):
+        """
+        Store hashes for a file, replacing any older entry.
+        
+        Args:
+            file_id: Google Drive file ID
+            modified_time: Drive modifiedTime of the file
+            size: File size in bytes
+            md5: MD5 checksum (hex)
+            phash: Perceptual hash (hex)
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO file_hashes (file_id, modified_time, size, md5, phash) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (file_id, modified_time, size, md5, phash)
+            )
+    
+    def commit(self):
+        """Flush pending writes to disk."""
+        with self._lock:
+            self._conn.commit()
+    
+    def close(self):
+        """Commit and close the database."""
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            self.close()
+        except sqlite3.Error as e:
+            logger.error(f"Error closing hash cache: {e}")
@@ -0,0 +1,94 @@
+"""
+Persistent Gmail Message Cache
+Stores parsed message details in SQLite so later scans skip messages.get
+"""
+import json
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+from config import GMAIL_MESSAGE_CACHE_DB
+
+logger = logging.getLogger(__name__)
+
+
+class MessageCache:
+    """SQLite-backed cache of parsed Gmail messages keyed by message ID and size threshold."""
+    
+    MISSING = object()  # get() result for messages not in the cache
+    
+    def __init__(self, db_path: Path = GMAIL_MESSAGE_CACHE_DB):
+        """
+        Open (or create) the cache database.
+        
+        Args:
+            db_path: Location of the SQLite file
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            "message_id TEXT, "
+            "min_size INTEGER, "
+            "details TEXT, "
+            "PRIMARY KEY (message_id, min_size))"
+        )
+        self._conn.commit()
+    
+    def get(self, message_id: str, min_size: int):
+        """
+        Look up the parsed details of a message.
+        
+        A message's headers and attachments never change once it exists,
+        so entries stay valid until the message is gone from the mailbox.
+        
+        Args:
+            message_id: Gmail message ID
+            min_size: Attachment size threshold (bytes) the details were parsed with
+        
+        Returns:
+            Message details, None if the message has no large attachments,
+            or MessageCache.MISSING on a cache miss
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT details FROM messages WHERE message_id = ? AND min_size = ?",
+                (message_id, min_size)
+            ).fetchone()
+        
+        if row is None:
+            return self.MISSING
+        return json.loads(row[0])
+    
+    def put_many(self, entries: Iterable[Tuple[str, Optional[Dict]]], min_size: int):
+        """
+        Store parsed details for several messages, replacing older entries.
+        
+        Args:
+            entries: (message ID, details or None) pairs
+            min_size: Attachment size threshold (bytes) the details were parsed with
+        """
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO messages (message_id, min_size, details) VALUES (?, ?, ?)",
+                ((message_id, min_size, json.dumps(details, separators=(',', ':')))
+                 for message_id, details in entries)
+            )
+    
+    def close(self):
+        """Close the database."""
+        with self._lock:
+            self._conn.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            self.close()
+        except sqlite3.Error as e:
+            logger.error(f"Error closing message cache: {e}")
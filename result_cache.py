@@ -0,0 +1,77 @@
+"""
+Persistent Result Cache
+Stores finder results on disk so re-printing a report skips the analysis
+"""
+import functools
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Callable, Iterable, Tuple
+from config import RESULT_CACHE_DIR, RESULT_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+
+def digest_pairs(pairs: Iterable[Tuple[str, str]], *extra) -> str:
+    """
+    Build an order-independent cache key from (id, version) pairs.
+    
+    Args:
+        pairs: (file_id, modifiedTime or hash) pairs describing the input
+        *extra: Additional parameters the result depends on
+    
+    Returns:
+        Hex digest identifying the input
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for file_id, version in sorted(pairs):
+        digest.update(f"{file_id}\0{version}\n".encode('utf-8'))
+    for value in extra:
+        digest.update(repr(value).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def disk_memo(key: Callable[..., str], ttl: int = RESULT_CACHE_TTL):
+    """
+    Cache a method's JSON-serializable result under RESULT_CACHE_DIR.
+    
+    The wrapped method gains a `use_cache` keyword; pass False to force
+    recomputation (the fresh result still replaces the cached one).
+    
+    Args:
+        key: Called with the method's arguments, returns the cache key
+        ttl: Seconds a cached result stays valid
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, use_cache: bool = True, **kwargs):
+            path = RESULT_CACHE_DIR / f"{func.__qualname__}-{key(*args, **kwargs)}.json"
+            
+            if use_cache:
+                try:
+                    if time.time() - path.stat().st_mtime < ttl:
+                        with open(path, 'rb') as f:
+                            result = json.load(f)
+                        print(f"♻️  Reused cached result ({path.name})")
+                        return result
+                except FileNotFoundError:
+                    pass
+                except (OSError, ValueError) as e:
+                    logger.error(f"Ignoring unreadable result cache {path}: {e}")
+            
+            result = func(*args, **kwargs)
+            
+            try:
+                RESULT_CACHE_DIR.mkdir(exist_ok=True)
+                tmp_path = path.with_suffix('.tmp')
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(result, f, separators=(',', ':'))
+                os.replace(tmp_path, path)
+            except (OSError, TypeError) as e:
+                logger.error(f"Error writing result cache {path}: {e}")
+            
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,69 @@
+"""Tests for token storage and credential caching."""
+import json
+import pickle
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+import pytest
+from google.oauth2.credentials import Credentials
+import auth
+
+
+@pytest.fixture
+def token_file(tmp_path, monkeypatch):
+    path = tmp_path / 'token.json'
+    monkeypatch.setattr(auth, 'TOKEN_FILE', path)
+    auth.reset_services()
+    yield path
+    auth.reset_services()
+
+
+def _creds(token='access-token', expires_in=timedelta(hours=1)):
+    # google-auth keeps expiry as naive UTC
+    expiry = datetime.now(timezone.utc).replace(tzinfo=None) + expires_in
+    return Credentials(token=token, refresh_token='refresh-token', token_uri='https://oauth2.googleapis.com/token',
+                       client_id='client-id', client_secret='client-secret', scopes=auth.SCOPES, expiry=expiry)
+
+
+def test_legacy_pickle_token_is_rewritten_as_json(token_file):
+    token_file.write_bytes(pickle.dumps(_creds()))
+    
+    creds = auth.get_credentials()
+    
+    assert creds.token == 'access-token'
+    stored = json.loads(token_file.read_text(encoding='utf-8'))
+    assert stored['refresh_token'] == 'refresh-token'
+
+
+def test_json_token_is_loaded(token_file):
+    token_file.write_text(_creds('from-json').to_json(), encoding='utf-8')
+    
+    assert auth.get_credentials().token == 'from-json'
+
+
+def test_concurrent_callers_refresh_an_expired_token_once(token_file, monkeypatch):
+    token_file.write_text(_creds('stale', expires_in=timedelta(hours=-1)).to_json(), encoding='utf-8')
+    refreshes = []
+    
+    def refresh(self, request):
+        refreshes.append(self)
+        time.sleep(0.05)  # keep the refresh in flight while the other threads arrive
+        self.token = 'fresh'
+        self.expiry = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(hours=1)
+    
+    monkeypatch.setattr(Credentials, 'refresh', refresh)
+    start = threading.Barrier(8)
+    tokens = []
+    
+    def worker():
+        start.wait()
+        tokens.append(auth.get_credentials().token)
+    
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert len(refreshes) == 1
+    assert tokens == ['fresh'] * 8
@@ -0,0 +1,41 @@
+"""Tests for the CLI's argparse-free fast path."""
+import pytest
+import cli
+
+
+@pytest.mark.parametrize('argv', [
+    ['drive-scan'],
+    ['drive-scan', '--min-size', '12'],
+    ['drive-duplicates', '--dump', '--workers', '3'],
+    ['drive-similar', '--threshold', '0.85', '--workers', '2'],
+    ['gmail-scan', '--max-emails', '40', '--min-size', '2', '--dump'],
+])
+def test_fast_path_matches_argparse(argv):
+    fast = cli.fast_parse_args(argv)
+    
+    assert fast is not None
+    assert vars(fast) == vars(cli.build_parser().parse_args(argv))
+
+
+@pytest.mark.parametrize('argv', [
+    [],
+    ['--help'],
+    ['drive-scan', '--help'],
+    ['drive-duplicates', '--workers=3'],  # = syntax is left to argparse
+    ['drive-duplicates', '--work', '3'],  # so are abbreviations
+    ['drive-duplicates', '--workers'],
+    ['drive-similar', '--threshold', 'high'],
+])
+def test_fast_path_defers_unusual_invocations(argv):
+    assert cli.fast_parse_args(argv) is None
+
+
+@pytest.mark.parametrize('workers', ['0', '-2'])
+def test_workers_below_one_are_usage_errors(workers, capsys):
+    argv = ['drive-duplicates', '--workers', workers]
+    
+    assert cli.fast_parse_args(argv) is None
+    with pytest.raises(SystemExit) as exit_info:
+        cli.build_parser().parse_args(argv)
+    assert exit_info.value.code == 2
+    assert 'invalid positive_int value' in capsys.readouterr().err
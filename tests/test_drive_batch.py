@@ -0,0 +1,136 @@
+"""Tests for the batched dump-and-delete helpers shared by the Drive finders."""
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+import drive_batch
+from drive_batch import batch_delete, batch_dump_and_delete, chunk_groups, split_delete_outcomes
+
+
+def _http_error(status):
+    return HttpError(httplib2.Response({'status': status}), b'{}')
+
+
+class FakeBatch:
+    def __init__(self, drive, callback):
+        self.drive = drive
+        self.callback = callback
+        self.requests = []
+    
+    def add(self, request, request_id):
+        self.requests.append(request_id)
+    
+    def execute(self):
+        self.drive.batches.append(self.requests)
+        if self.drive.fail_batches:
+            raise ConnectionError("connection reset")
+        for file_id in self.requests:
+            self.callback(file_id, None, self.drive.errors.get(file_id))
+
+
+class FakeDrive:
+    """Drive service whose batched deletes fail for the IDs in errors."""
+    
+    def __init__(self, errors=None, fail_batches=False):
+        self.errors = errors or {}
+        self.fail_batches = fail_batches
+        self.batches = []
+    
+    def new_batch_http_request(self, callback):
+        return FakeBatch(self, callback)
+    
+    def files(self):
+        return self
+    
+    def delete(self, fileId):
+        return fileId
+
+
+@pytest.fixture
+def use_drive(monkeypatch):
+    def use(drive):
+        monkeypatch.setattr(drive_batch, 'get_drive_service', lambda: drive)
+        return drive
+    return use
+
+
+def _downloaded(*file_ids):
+    return [{'id': file_id, 'name': f"{file_id}.jpg"} for file_id in file_ids]
+
+
+def test_split_delete_outcomes_maps_403_to_no_permission():
+    downloaded = _downloaded('ok', 'shared', 'server_error', 'network', 'no_outcome')
+    outcomes = {
+        'ok': None,
+        'shared': _http_error(403),
+        'server_error': _http_error(500),
+        'network': ConnectionError("reset"),
+    }
+    
+    deleted, skipped = split_delete_outcomes(downloaded, outcomes)
+    
+    assert deleted == ['ok']
+    assert {s['id']: s['reason'] for s in skipped} == {
+        'shared': 'no_permission',
+        'server_error': 'delete_failed',
+        'network': 'delete_failed',
+        'no_outcome': 'delete_failed',
+    }
+
+
+def test_batch_delete_splits_requests_and_reports_errors(use_drive):
+    drive = use_drive(FakeDrive(errors={'f3': _http_error(403)}))
+    
+    outcomes = batch_delete(_downloaded(*(f"f{i}" for i in range(5))), batch_size=2)
+    
+    assert drive.batches == [['f0', 'f1'], ['f2', 'f3'], ['f4']]
+    assert [file_id for file_id, error in outcomes.items() if error is not None] == ['f3']
+
+
+def test_failed_batch_marks_every_file_as_delete_failed(use_drive):
+    use_drive(FakeDrive(fail_batches=True))
+    downloaded = _downloaded('a', 'b')
+    
+    deleted, skipped = split_delete_outcomes(downloaded, batch_delete(downloaded))
+    
+    assert deleted == []
+    assert [s['reason'] for s in skipped] == ['delete_failed', 'delete_failed']
+
+
+def test_chunk_groups_counts_files_to_delete():
+    groups = [{'files': [None] * n} for n in (3, 2, 5, 2)]  # 2, 1, 4 and 1 files to delete
+    
+    assert [len(chunk) for chunk in chunk_groups(groups, batch_size=3)] == [2, 1, 1]
+
+
+def test_batch_dump_and_delete_finishes_groups_in_order(use_drive):
+    use_drive(FakeDrive(errors={'b2': _http_error(403)}))
+    groups = [{'name': 'a', 'files': ['a0', 'a1']}, {'name': 'b', 'files': ['b0', 'b1', 'b2']}]
+    
+    def download_group(group):
+        return {'downloaded': _downloaded(*group['files'][1:])}
+    
+    def finish_group(group, partial, deleted, skipped):
+        return group['name'], deleted, [s['id'] for s in skipped]
+    
+    results = list(batch_dump_and_delete(groups, download_group, finish_group, batch_size=2, workers=2))
+    
+    assert results == [('a', ['a1'], []), ('b', ['b1'], ['b2'])]
+
+
+def test_prepare_chunk_runs_before_each_chunk_is_downloaded(use_drive):
+    use_drive(FakeDrive())
+    groups = [{'name': name, 'files': [f'{name}0', f'{name}1']} for name in ('a', 'b', 'c')]
+    events = []
+    
+    def download_group(group):
+        events.append(('download', group['name']))
+        return {'downloaded': _downloaded(*group['files'][1:])}
+    
+    def prepare_chunk(chunk):
+        events.append(('prepare', [group['name'] for group in chunk]))
+    
+    list(batch_dump_and_delete(groups, download_group, lambda *args: None, batch_size=2, workers=1,
+                               prepare_chunk=prepare_chunk))
+    
+    assert events == [('prepare', ['a', 'b']), ('download', 'a'), ('download', 'b'),
+                      ('prepare', ['c']), ('download', 'c')]
@@ -0,0 +1,241 @@
+"""Tests for the duplicate finder: incremental listing, content grouping, READMEs and ranged downloads."""
+import hashlib
+import pytest
+import drive_duplicates
+from drive_duplicates import DriveDuplicateFinder, PREFIX_HASH_BYTES
+from file_index import FileIndex
+
+
+class FakeMediaRequest:
+    def __init__(self, file_id, data):
+        self.uri = f"https://drive.test/{file_id}?alt=media"
+        self.data = data
+        self.headers = {}
+    
+    def execute(self, num_retries=0):
+        start, end = map(int, self.headers['range'][len('bytes='):].split('-'))
+        return self.data[start:end + 1]
+
+
+class FakeChangesRequest:
+    def __init__(self, response):
+        self.response = response
+    
+    def execute(self):
+        return self.response
+
+
+class FakeDrive:
+    """Just enough of the Drive service for get_media and changes().list."""
+    
+    def __init__(self, contents=None, change_pages=None):
+        self.contents = contents or {}
+        self.change_pages = change_pages or {}
+        self.media_requests = []
+    
+    def files(self):
+        return self
+    
+    def changes(self):
+        return self
+    
+    def get_media(self, fileId):
+        self.media_requests.append(fileId)
+        return FakeMediaRequest(fileId, self.contents.get(fileId, b''))
+    
+    def list(self, pageToken, **kwargs):
+        return FakeChangesRequest(self.change_pages[pageToken])
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=b''):
+        self.status_code = status_code
+        self.body = body
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        return False
+    
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise ConnectionError(f"HTTP {self.status_code}")
+    
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), chunk_size):
+            yield self.body[start:start + chunk_size]
+
+
+class FakeSession:
+    """Media session serving Range requests; the first request per offset in flaky gets a 503."""
+    
+    def __init__(self, data, flaky=(), status=206):
+        self.data = data
+        self.flaky = set(flaky)
+        self.status = status
+        self.requests = []
+    
+    def get(self, uri, headers, stream):
+        start, end = map(int, headers['Range'][len('bytes='):].split('-'))
+        self.requests.append(start)
+        if start in self.flaky:
+            self.flaky.discard(start)
+            return FakeResponse(503)
+        return FakeResponse(self.status, self.data[start:end + 1])
+
+
+@pytest.fixture
+def make_finder(monkeypatch):
+    def make(drive, file_index=None):
+        monkeypatch.setattr(DriveDuplicateFinder, 'service', property(lambda self: drive))
+        finder = DriveDuplicateFinder(file_index=file_index)
+        finder.full_digests = []
+        
+        def full_digest(file):
+            finder.full_digests.append(file['id'])
+            return hashlib.blake2b(drive.contents[file['id']], digest_size=16).hexdigest()
+        
+        monkeypatch.setattr(finder, '_full_digest', full_digest)
+        return finder
+    return make
+
+
+def _file(file_id, data, mime_type='application/octet-stream'):
+    return {'id': file_id, 'name': f"{file_id}.bin", 'mimeType': mime_type, 'size': str(len(data))}
+
+
+def test_group_by_content_matches_only_identical_files(make_finder):
+    big = PREFIX_HASH_BYTES * 3
+    same = b'a' * big
+    contents = {
+        'a1': same,
+        'a2': same,
+        'tail': b'a' * (big - 1) + b'b',  # same size and prefix, different tail
+        'head': b'b' + b'a' * (big - 1),  # same size, different prefix
+        'small1': b'small',
+        'small2': b'small',
+        'lonely': b'x' * 10,  # no other file of this size
+    }
+    drive = FakeDrive(contents)
+    finder = make_finder(drive)
+    
+    groups = finder._group_by_content([_file(file_id, data) for file_id, data in contents.items()])
+    
+    assert sorted(sorted(f['id'] for f in group) for group in groups.values()) == [['a1', 'a2'], ['small1', 'small2']]
+    # Only files whose size and prefix still collide are hashed in full
+    assert sorted(finder.full_digests) == ['a1', 'a2', 'tail']
+    assert 'lonely' not in drive.media_requests
+
+
+def test_group_by_content_skips_native_google_files(make_finder):
+    drive = FakeDrive({'doc1': b'same', 'doc2': b'same'})
+    finder = make_finder(drive)
+    
+    files = [_file(file_id, b'same', 'application/vnd.google-apps.document') for file_id in ('doc1', 'doc2')]
+    
+    assert finder._group_by_content(files) == {}
+    assert drive.media_requests == []
+
+
+def test_content_groups_are_labelled_with_content_hash(make_finder):
+    finder = make_finder(FakeDrive())
+    md5_group = [dict(_file(f'm{i}', b'12345'), md5Checksum='abc') for i in range(2)]
+    content_group = [_file(f'c{i}', b'123') for i in range(2)]
+    
+    stats = finder.calculate_wasted_space({'abc': md5_group, 'ff00': content_group})
+    labels = {group['files'][0]['id']: (group['md5'], group['content_hash']) for group in stats['duplicate_groups']}
+    
+    assert labels == {'m0': ('abc', None), 'c0': (None, 'ff00')}
+
+
+def test_list_changes_drops_removed_trashed_and_not_owned_files(make_finder, tmp_path):
+    index = FileIndex(tmp_path / 'index.db')
+    index.replace_all([_file(file_id, b'data') for file_id in ('kept', 'removed', 'trashed', 'given_away', 'edited')],
+                      'token-1')
+    change_pages = {
+        'token-1': {
+            'changes': [
+                {'fileId': 'removed', 'removed': True},
+                {'fileId': 'trashed', 'file': dict(_file('trashed', b'data'), trashed=True, ownedByMe=True)},
+                {'fileId': 'given_away', 'file': dict(_file('given_away', b'data'), trashed=False, ownedByMe=False)},
+                {'fileId': 'edited', 'file': dict(_file('edited', b'new data'), trashed=False, ownedByMe=True)},
+            ],
+            'nextPageToken': 'token-2',
+        },
+        'token-2': {
+            'changes': [
+                {'fileId': 'new', 'file': dict(_file('new', b'data'), trashed=False, ownedByMe=True)},
+                {'fileId': 'folder', 'file': dict(_file('folder', b'', drive_duplicates.FOLDER_MIMETYPE),
+                                                  trashed=False, ownedByMe=True)},
+            ],
+            'newStartPageToken': 'token-3',
+        },
+    }
+    finder = make_finder(FakeDrive(change_pages=change_pages), file_index=index)
+    
+    files = {f['id']: f for f in finder.list_all_files()}
+    
+    assert sorted(files) == ['edited', 'kept', 'new']
+    assert files['edited']['size'] == str(len(b'new data'))
+    assert 'trashed' not in files['edited'] and 'ownedByMe' not in files['edited']
+    assert index.get_page_token() == 'token-3'
+    index.close()
+
+
+def _group(md5, *file_ids):
+    files = [{'id': file_id, 'name': 'photo.jpg', 'size': '4', 'createdTime': '2024-01-01T00:00:00Z'}
+             for file_id in file_ids]
+    return {'md5': md5, 'content_hash': None, 'filename': 'photo.jpg', 'files': files, 'num_copies': len(files),
+            'file_size_mb': 4 / (1024 * 1024), 'wasted_mb': 4 * (len(files) - 1) / (1024 * 1024)}
+
+
+def test_readme_reports_each_skip_reason(make_finder, tmp_path):
+    finder = make_finder(FakeDrive())
+    group = _group('abcdef123', 'keep', 'ok', 'shared', 'flaky')
+    partial = {'dump_folder': tmp_path, 'failed': [],
+               'downloaded': [{'id': file_id, 'name': 'photo.jpg', 'size': 4} for file_id in ('ok', 'shared', 'flaky')]}
+    skipped = [{'id': 'shared', 'name': 'photo.jpg', 'reason': 'no_permission'},
+               {'id': 'flaky', 'name': 'photo.jpg', 'reason': 'delete_failed'}]
+    
+    result = finder._finish_group(group, 0, partial, ['ok'], skipped)
+    
+    assert result['space_freed_bytes'] == 4
+    readme = (tmp_path / 'README.txt').read_text(encoding='utf-8')
+    assert "Skipped (no permission): 1 files" in readme
+    assert "Skipped (delete failed): 1 files" in readme
+    assert "2. photo.jpg (🗑️  DOWNLOADED & DELETED FROM DRIVE)" in readme
+    assert "3. photo.jpg (⚠️  SKIPPED (No permission - shared file))" in readme
+    assert "4. photo.jpg (⚠️  SKIPPED (Delete failed - run the dump again))" in readme
+
+
+@pytest.fixture
+def use_session(monkeypatch):
+    monkeypatch.setattr(drive_duplicates, 'RANGE_PART_BYTES', 16)
+    monkeypatch.setattr(drive_duplicates, 'RANGE_STREAM_BYTES', 5)
+    monkeypatch.setattr(drive_duplicates.time, 'sleep', lambda seconds: None)
+    
+    def use(session):
+        monkeypatch.setattr(drive_duplicates, 'get_media_session', lambda: session)
+        return session
+    return use
+
+
+def test_ranged_download_reassembles_parts_and_retries_server_errors(make_finder, use_session, tmp_path):
+    data = bytes(range(40))
+    session = use_session(FakeSession(data, flaky={16}))
+    finder = make_finder(FakeDrive())
+    destination = tmp_path / 'big.bin'
+    
+    finder._download_ranges('big', str(destination), len(data))
+    
+    assert destination.read_bytes() == data
+    assert sorted(session.requests) == [0, 16, 16, 32]
+
+
+def test_ranged_download_rejects_a_server_ignoring_the_range(make_finder, use_session, tmp_path):
+    use_session(FakeSession(bytes(40), status=200))
+    finder = make_finder(FakeDrive())
+    
+    with pytest.raises(ValueError):
+        finder._download_ranges('big', str(tmp_path / 'big.bin'), 40)
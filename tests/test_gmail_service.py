@@ -0,0 +1,270 @@
+"""Tests for the Gmail attachment scanner."""
+import base64
+from pathlib import Path
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+import gmail_service
+from gmail_service import GmailAttachmentScanner
+from message_cache import MessageCache
+
+
+@pytest.fixture
+def make_scanner(monkeypatch):
+    def make(gmail=None):
+        monkeypatch.setattr(GmailAttachmentScanner, 'service', property(lambda self: gmail))
+        return GmailAttachmentScanner(min_size_mb=1)
+    return make
+
+
+def _email(msg_id, size):
+    attachment = {'filename': f"{msg_id}.pdf", 'mime_type': 'application/pdf', 'size': size,
+                  'size_mb': size / (1024 * 1024), 'attachment_id': f"att-{msg_id}", 'message_id': msg_id}
+    return {'id': msg_id, 'subject': f"Subject {msg_id}", 'from': 'someone@example.com', 'date': 'Mon, 1 Jan 2024',
+            'attachments': [attachment], 'num_attachments': 1, 'total_attachment_size_bytes': size,
+            'total_attachment_size_mb': size / (1024 * 1024)}
+
+
+def test_stats_pick_the_largest_emails_biggest_first(make_scanner):
+    scanner = make_scanner()
+    emails = [_email(f'm{i}', size) for i, size in enumerate([30, 10, 50, 20, 40])]
+    
+    stats = scanner.calculate_stats(emails, top_n=3)
+    
+    assert [e['id'] for e in stats['top_emails']] == ['m2', 'm4', 'm0']
+    assert stats['emails'] is emails
+    assert stats['total_size_bytes'] == 150
+
+
+def test_report_lists_every_top_email(make_scanner):
+    scanner = make_scanner()
+    emails = [_email(f'm{i}', 1000 + i) for i in range(30)]
+    
+    report = scanner.generate_report(scanner.calculate_stats(emails, top_n=25))
+    
+    assert "TOP 25 LARGEST EMAILS" in report
+    assert "25. Subject m5" in report
+    assert "Subject m4" not in report
+
+
+def _http_error(status):
+    return HttpError(httplib2.Response({'status': status}), b'{}')
+
+
+def _message(msg_id, size=2 * 1024 * 1024):
+    attachment = {'filename': f"{msg_id}.pdf", 'mimeType': 'application/pdf',
+                  'body': {'attachmentId': f"att-{msg_id}", 'size': size}}
+    return {'id': msg_id, 'payload': {'headers': [{'name': 'Subject', 'value': f"Subject {msg_id}"}],
+                                      'parts': [attachment]}}
+
+
+class FakeRequest:
+    def __init__(self, execute, msg_id=None):
+        self.execute = execute
+        self.msg_id = msg_id
+
+
+class FakeBatch:
+    def __init__(self, gmail, callback):
+        self.gmail = gmail
+        self.callback = callback
+        self.requests = []
+    
+    def add(self, request, request_id):
+        self.requests.append(request_id)
+    
+    def execute(self):
+        self.gmail.batches.append(self.requests)
+        for msg_id in self.requests:
+            statuses = self.gmail.part_errors.get(msg_id)
+            if statuses:
+                self.callback(msg_id, None, _http_error(statuses.pop(0)))
+            else:
+                self.callback(msg_id, self.gmail.masked(msg_id), None)
+
+
+class FakeAttachments:
+    def __init__(self, data):
+        self.data = data
+    
+    def get(self, userId, messageId, id, fields=None):
+        return FakeRequest(lambda: {'data': base64.urlsafe_b64encode(self.data[id]).decode('ascii')})
+
+
+class FakeGmail:
+    """
+    Gmail service recording batch gets and batchModify calls.
+    
+    part_errors maps a message ID to the statuses its successive batch parts
+    fail with; batchModify calls listed in fail_calls raise.
+    """
+    
+    def __init__(self, messages=(), part_errors=None, fail_calls=(), attachment_data=None):
+        self.messages_by_id = {message['id']: message for message in messages}
+        self.part_errors = {msg_id: list(statuses) for msg_id, statuses in (part_errors or {}).items()}
+        self.fail_calls = set(fail_calls)
+        self.attachment_data = attachment_data or {}
+        self.batches = []
+        self.unmasked_gets = []
+        self.modify_calls = []
+    
+    def new_batch_http_request(self, callback):
+        return FakeBatch(self, callback)
+    
+    def users(self):
+        return self
+    
+    def messages(self):
+        return self
+    
+    def attachments(self):
+        return FakeAttachments(self.attachment_data)
+    
+    def list(self, userId, q, maxResults, pageToken):
+        return FakeRequest(lambda: {'messages': [{'id': msg_id} for msg_id in self.messages_by_id]})
+    
+    def masked(self, msg_id):
+        """The message as the fields mask returns it: parts below PART_DEPTH are cut off."""
+        def cut(part, depth):
+            part = dict(part)
+            if depth == gmail_service.PART_DEPTH:
+                part.pop('parts', None)
+            elif 'parts' in part:
+                part['parts'] = [cut(child, depth + 1) for child in part['parts']]
+            return part
+        message = self.messages_by_id[msg_id]
+        return dict(message, payload=cut(message['payload'], 1))
+    
+    def get(self, userId, id, format, fields=None):
+        if fields is None:
+            self.unmasked_gets.append(id)
+            return FakeRequest(lambda: self.messages_by_id[id], id)
+        return FakeRequest(lambda: self.masked(id), id)
+    
+    def batchModify(self, userId, body):
+        def execute():
+            self.modify_calls.append(body)
+            if len(self.modify_calls) - 1 in self.fail_calls:
+                raise ConnectionError("connection reset")
+            return {}
+        return FakeRequest(execute)
+
+
+def _nested(message, depth):
+    """Wrap a message's attachment in depth - 1 levels of multipart containers."""
+    payload = message['payload']
+    part = payload['parts'][0]
+    for _ in range(depth - 1):
+        part = {'mimeType': 'multipart/mixed', 'filename': '', 'parts': [part]}
+    return dict(message, payload=dict(payload, mimeType='multipart/mixed', parts=[part]))
+
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(gmail_service.time, 'sleep', sleeps.append)
+    return sleeps
+
+
+def test_batch_get_retries_rate_limited_parts_in_smaller_batches(make_scanner, no_sleep):
+    gmail = FakeGmail([_message(f'm{i}') for i in range(4)], part_errors={'m1': [429], 'm3': [503, 500]})
+    scanner = make_scanner(gmail)
+    failed = []
+    
+    details = scanner._get_message_batch(['m0', 'm1', 'm2', 'm3'], failed)
+    
+    assert sorted(details) == ['m0', 'm1', 'm2', 'm3']
+    assert gmail.batches == [['m0', 'm1', 'm2', 'm3'], ['m1', 'm3'], ['m3']]
+    assert no_sleep == [1, 2]
+    assert failed == []
+
+
+def test_batch_get_reports_parts_that_never_succeed(make_scanner, no_sleep):
+    gmail = FakeGmail([_message(f'm{i}') for i in range(3)],
+                      part_errors={'m0': [404], 'm2': [429] * (gmail_service.BATCH_RETRIES + 1)})
+    scanner = make_scanner(gmail)
+    failed = []
+    
+    details = scanner._get_message_batch(['m0', 'm1', 'm2'], failed)
+    
+    assert list(details) == ['m1']
+    assert sorted(failed) == ['m0', 'm2']
+    assert len(gmail.batches) == gmail_service.BATCH_RETRIES + 1
+
+
+def test_search_reports_messages_that_could_not_be_loaded(make_scanner, no_sleep, capsys):
+    gmail = FakeGmail([_message('m0'), _message('m1')], part_errors={'m1': [500] * (gmail_service.BATCH_RETRIES + 1)})
+    scanner = make_scanner(gmail)
+    
+    emails = scanner.search_emails_with_large_attachments()
+    
+    assert [e['id'] for e in emails] == ['m0']
+    assert "Could not load 1 messages" in capsys.readouterr().out
+
+
+def test_messages_nested_deeper_than_the_mask_are_fetched_again(make_scanner):
+    shallow = _nested(_message('shallow'), gmail_service.PART_DEPTH - 2)
+    deep = _nested(_message('deep'), gmail_service.PART_DEPTH + 1)
+    gmail = FakeGmail([shallow, deep])
+    scanner = make_scanner(gmail)
+    
+    details = scanner._get_message_batch(['shallow', 'deep'])
+    
+    assert sorted(details) == ['deep', 'shallow']
+    assert details['deep']['attachments'][0]['filename'] == 'deep.pdf'
+    assert gmail.unmasked_gets == ['deep']
+    assert scanner.get_message_details('deep')['num_attachments'] == 1
+    assert gmail.unmasked_gets == ['deep', 'deep']
+
+
+def test_search_fetches_only_messages_missing_from_the_cache(monkeypatch, tmp_path, no_sleep):
+    gmail = FakeGmail([_message('m0'), _message('m1'), _message('small', size=10)],
+                      part_errors={'m1': [500] * (gmail_service.BATCH_RETRIES + 1)})
+    monkeypatch.setattr(GmailAttachmentScanner, 'service', property(lambda self: gmail))
+    
+    with MessageCache(tmp_path / 'messages.db') as cache:
+        scanner = GmailAttachmentScanner(min_size_mb=1, message_cache=cache)
+        assert [e['id'] for e in scanner.search_emails_with_large_attachments()] == ['m0']
+        gmail.batches.clear()
+        
+        emails = scanner.search_emails_with_large_attachments()
+    
+    # m0 and the small message were cached; only the failed fetch is tried again
+    assert [e['id'] for e in emails] == ['m0', 'm1']
+    assert gmail.batches == [['m1']]
+
+
+def test_batch_trash_sends_one_batch_modify_per_chunk(make_scanner):
+    gmail = FakeGmail(fail_calls={1})
+    scanner = make_scanner(gmail)
+    
+    outcomes = scanner.batch_trash_emails([f'm{i}' for i in range(5)], batch_size=2)
+    
+    assert [call['ids'] for call in gmail.modify_calls] == [['m0', 'm1'], ['m2', 'm3'], ['m4']]
+    assert all(call['addLabelIds'] == ['TRASH'] for call in gmail.modify_calls)
+    assert outcomes == {'m0': True, 'm1': True, 'm2': False, 'm3': False, 'm4': True}
+
+
+def test_same_named_attachments_are_saved_to_separate_files(make_scanner, monkeypatch, tmp_path):
+    monkeypatch.setattr(gmail_service, 'GMAIL_DUMP_DIR', tmp_path)
+    gmail = FakeGmail(attachment_data={'att-1': b'first', 'att-2': b'second', 'att-3': b'third'})
+    scanner = make_scanner(gmail)
+    email = _email('m0', 3)
+    email['attachments'] = [dict(email['attachments'][0], id=f'att-{i}', filename='scan.pdf') for i in (1, 2, 3)]
+    
+    with gmail_service.ThreadPoolExecutor(max_workers=3) as executor:
+        partial, = scanner._download_emails([email], executor)
+    
+    assert partial['failed'] == []
+    contents = {Path(d['local_path']).name: Path(d['local_path']).read_bytes() for d in partial['downloaded']}
+    assert contents == {'scan.pdf': b'first', 'scan_1.pdf': b'second', 'scan_2.pdf': b'third'}
+
+
+def test_attachments_decode_in_chunks_to_the_same_bytes(make_scanner, monkeypatch, tmp_path):
+    monkeypatch.setattr(gmail_service, 'DECODE_CHUNK_CHARS', 8)
+    data = bytes(range(256)) * 3 + b'tail'  # not a multiple of the chunk, so the last one is padded
+    scanner = make_scanner(FakeGmail(attachment_data={'att-1': data}))
+    destination = tmp_path / 'file.bin'
+    
+    assert scanner.download_attachment('m0', 'att-1', 'file.bin', destination)
+    assert destination.read_bytes() == data
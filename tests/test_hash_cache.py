@@ -0,0 +1,40 @@
+"""Tests for the persistent SQLite hash cache."""
+import sqlite3
+import pytest
+from hash_cache import HashCache
+
+
+def test_entry_is_valid_only_while_size_and_modified_time_match(tmp_path):
+    with HashCache(tmp_path / 'hashes.db') as cache:
+        cache.put('file1', '2024-01-01T00:00:00Z', 100, md5='abc', phash='ff00')
+        
+        assert cache.get('file1', '2024-01-01T00:00:00Z', 100) == {'md5': 'abc', 'phash': 'ff00'}
+        assert cache.get('file1', '2024-02-01T00:00:00Z', 100) is None
+        assert cache.get('file1', '2024-01-01T00:00:00Z', 101) is None
+        assert cache.get('missing', '2024-01-01T00:00:00Z', 100) is None
+
+
+def test_put_replaces_the_older_entry(tmp_path):
+    with HashCache(tmp_path / 'hashes.db') as cache:
+        cache.put('file1', 'old', 100, phash='0000')
+        cache.put('file1', 'new', 200, phash='ffff')
+        
+        assert cache.get('file1', 'old', 100) is None
+        assert cache.get('file1', 'new', 200) == {'md5': None, 'phash': 'ffff'}
+
+
+def test_entries_survive_reopening(tmp_path):
+    db_path = tmp_path / 'hashes.db'
+    with HashCache(db_path) as cache:
+        cache.put('file1', 'mtime', 100, phash='ff00')
+    
+    with HashCache(db_path) as cache:
+        assert cache.get('file1', 'mtime', 100) == {'md5': None, 'phash': 'ff00'}
+
+
+def test_with_block_closes_the_connection(tmp_path):
+    with HashCache(tmp_path / 'hashes.db') as cache:
+        pass
+    
+    with pytest.raises(sqlite3.ProgrammingError):
+        cache.get('file1', 'mtime', 100)
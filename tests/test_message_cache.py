@@ -0,0 +1,40 @@
+"""Tests for the persistent Gmail message cache."""
+import sqlite3
+import pytest
+from message_cache import MessageCache
+
+
+def test_entries_are_keyed_by_message_and_size_threshold(tmp_path):
+    details = {'id': 'm1', 'subject': 'Invoice', 'attachments': [{'filename': 'a.pdf', 'size': 2048}]}
+    with MessageCache(tmp_path / 'messages.db') as cache:
+        cache.put_many([('m1', details), ('m2', None)], 1024)
+        
+        assert cache.get('m1', 1024) == details
+        assert cache.get('m2', 1024) is None
+        assert cache.get('m1', 4096) is MessageCache.MISSING
+        assert cache.get('missing', 1024) is MessageCache.MISSING
+
+
+def test_put_many_replaces_the_older_entry(tmp_path):
+    with MessageCache(tmp_path / 'messages.db') as cache:
+        cache.put_many([('m1', None)], 1024)
+        cache.put_many([('m1', {'id': 'm1'})], 1024)
+        
+        assert cache.get('m1', 1024) == {'id': 'm1'}
+
+
+def test_entries_survive_reopening(tmp_path):
+    db_path = tmp_path / 'messages.db'
+    with MessageCache(db_path) as cache:
+        cache.put_many([('m1', {'id': 'm1'})], 1024)
+    
+    with MessageCache(db_path) as cache:
+        assert cache.get('m1', 1024) == {'id': 'm1'}
+
+
+def test_with_block_closes_the_connection(tmp_path):
+    with MessageCache(tmp_path / 'messages.db') as cache:
+        pass
+    
+    with pytest.raises(sqlite3.ProgrammingError):
+        cache.get('m1', 1024)
@@ -0,0 +1,69 @@
+"""Tests for the on-disk result cache."""
+import os
+import time
+import pytest
+import result_cache
+from result_cache import digest_pairs, disk_memo
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    path = tmp_path / '.result_cache'
+    monkeypatch.setattr(result_cache, 'RESULT_CACHE_DIR', path)
+    return path
+
+
+def _counting(ttl=3600):
+    calls = []
+    
+    @disk_memo(key=lambda files: digest_pairs(files), ttl=ttl)
+    def analyse(files):
+        calls.append(files)
+        return {'count': len(files)}
+    
+    return analyse, calls
+
+
+def test_digest_ignores_pair_order_but_not_extra_parameters():
+    pairs = [('a', '1'), ('b', '2')]
+    
+    assert digest_pairs(pairs) == digest_pairs(reversed(pairs))
+    assert digest_pairs(pairs) != digest_pairs([('a', '1'), ('b', '3')])
+    assert digest_pairs(pairs, 0.9) != digest_pairs(pairs, 0.8)
+
+
+def test_result_is_reused_until_the_input_changes(cache_dir):
+    analyse, calls = _counting()
+    
+    assert analyse([('a', '1')]) == {'count': 1}
+    assert analyse([('a', '1')]) == {'count': 1}
+    assert len(calls) == 1
+    
+    analyse([('a', '2')])
+    assert len(calls) == 2
+    assert len(list(cache_dir.glob('*.json'))) == 2
+
+
+def test_use_cache_false_recomputes_and_refreshes(cache_dir):
+    analyse, calls = _counting()
+    analyse([('a', '1')])
+    
+    analyse([('a', '1')], use_cache=False)
+    analyse([('a', '1')])
+    
+    assert len(calls) == 2
+
+
+def test_expired_or_unreadable_results_are_recomputed(cache_dir):
+    analyse, calls = _counting(ttl=60)
+    analyse([('a', '1')])
+    path, = cache_dir.glob('*.json')
+    
+    stale = time.time() - 120
+    os.utime(path, (stale, stale))
+    analyse([('a', '1')])
+    assert len(calls) == 2
+    
+    path.write_text('{not json', encoding='utf-8')
+    assert analyse([('a', '1')]) == {'count': 1}
+    assert len(calls) == 3
@@ -0,0 +1,107 @@
+"""Tests for the similar-image finder: hashing, hash reuse and the Hamming-radius index."""
+import io
+import imagehash
+import numpy as np
+import pytest
+from PIL import Image
+import drive_similar_images
+from drive_similar_images import MultiIndexHash, SimilarImageFinder, HASH_SIZE, decode_image_grid, hamming_distances
+from hash_cache import HashCache
+
+
+def _random_codes(rng, count):
+    return rng.integers(0, 2 ** 64, size=count, dtype=np.uint64)
+
+
+def _near_copies(rng, codes, max_flips):
+    """One copy of each code with up to max_flips random bits flipped."""
+    copies = codes.copy()
+    for i in range(len(copies)):
+        for bit in rng.choice(64, size=rng.integers(0, max_flips + 1), replace=False):
+            copies[i] ^= np.uint64(1) << np.uint64(int(bit))
+    return copies
+
+
+def test_hamming_distances_matches_bit_count():
+    rng = np.random.default_rng(0)
+    codes = _random_codes(rng, 200)
+    query = codes[0]
+    expected = [bin(int(code) ^ int(query)).count('1') for code in codes]
+    assert hamming_distances(codes, query).tolist() == expected
+
+
+@pytest.mark.parametrize('max_distance', [0, 3, 6, 7])
+def test_candidates_cover_every_hash_within_radius(max_distance):
+    rng = np.random.default_rng(max_distance)
+    base = _random_codes(rng, 150)
+    codes = np.concatenate([base, _near_copies(rng, base, max_distance + 2)])
+    index = MultiIndexHash(codes, max_distance)
+    assert index.chunks  # these radii use the bucketed path, not the full-scan fallback
+    
+    for i in range(len(codes)):
+        within = set(np.flatnonzero(hamming_distances(codes, codes[i]) <= max_distance).tolist())
+        candidates = index.candidates(i)
+        assert within <= set(candidates.tolist())
+        assert i in candidates
+        assert np.all(np.diff(candidates) > 0)
+
+
+def test_wide_radius_falls_back_to_full_scan():
+    codes = _random_codes(np.random.default_rng(1), 20)
+    index = MultiIndexHash(codes, max_distance=20)
+    assert index.candidates(5).tolist() == list(range(20))
+
+
+def _image(file_id, md5, size=200 * 1024):
+    return {'id': file_id, 'name': f"{file_id}.jpg", 'size': str(size), 'modifiedTime': '2024-01-01T00:00:00Z',
+            'md5Checksum': md5}
+
+
+@pytest.fixture
+def downloaded(monkeypatch):
+    downloaded = []
+    
+    def iter_prepared_images(self, files):
+        for file in files:
+            downloaded.append(file['id'])
+            yield file, np.arange(HASH_SIZE * (HASH_SIZE + 1), dtype=np.uint8).reshape(HASH_SIZE, HASH_SIZE + 1)
+    
+    monkeypatch.setattr(SimilarImageFinder, 'iter_prepared_images', iter_prepared_images)
+    return downloaded
+
+
+def test_copies_reuse_the_hash_stored_for_the_same_md5(tmp_path, downloaded):
+    with HashCache(tmp_path / 'hashes.db') as cache:
+        finder = SimilarImageFinder(hash_cache=cache)
+        first = finder.compute_hashes_for_images([_image('original', 'abc')])
+        
+        hashes = finder.compute_hashes_for_images([_image('original', 'abc'), _image('copy', 'abc'),
+                                                   _image('other', 'def')])
+        
+        assert downloaded == ['original', 'other']
+        assert hashes['copy'] == hashes['original'] == first['original']
+        assert cache.get('copy', '2024-01-01T00:00:00Z', 200 * 1024)['phash'] == first['original']
+
+
+
+def test_images_below_the_size_floor_are_never_downloaded(monkeypatch, downloaded):
+    monkeypatch.setattr(drive_similar_images, 'MIN_IMAGE_SIZE_KB', 50)
+    finder = SimilarImageFinder()
+    
+    hashes = finder.compute_hashes_for_images([_image('icon', 'abc', size=49 * 1024), _image('photo', 'def')])
+    
+    assert downloaded == ['photo']
+    assert list(hashes) == ['photo']
+
+def test_difference_hashes_match_imagehash_dhash():
+    rng = np.random.default_rng(0)
+    encoded = []
+    for size in [(64, 48), (37, 91), (200, 200)]:
+        buffer = io.BytesIO()
+        Image.fromarray(rng.integers(0, 256, size=size[::-1] + (3,), dtype=np.uint8)).save(buffer, format='PNG')
+        encoded.append(buffer.getvalue())
+    
+    grids = np.stack([decode_image_grid(data) for data in encoded])
+    
+    expected = [str(imagehash.dhash(Image.open(io.BytesIO(data)), hash_size=HASH_SIZE)) for data in encoded]
+    assert SimilarImageFinder.difference_hashes(grids) == expected